@@ -0,0 +1,64 @@
+﻿// det 바이너리 포맷 (application/x-det-packed) 디코더
+// 레이아웃은 server/det_store.py 의 pack_det_table 참고
+export const DET_PACKED_MEDIA_TYPE = "application/x-det-packed";
+
+const HEADER_SIZE = 32;
+
+export function decodeDetPacked(buffer) {
+  const dv = new DataView(buffer);
+  const magic = String.fromCharCode(dv.getUint8(0), dv.getUint8(1), dv.getUint8(2), dv.getUint8(3));
+  if (magic !== "DETB") throw new Error("invalid det packet");
+
+  const nCls        = dv.getUint16(6, true);
+  const nFrames     = dv.getUint32(8, true);
+  const nBoxes      = dv.getUint32(12, true);
+  const fpsSrc      = dv.getFloat32(16, true);
+  const frameW      = dv.getUint16(20, true);
+  const frameH      = dv.getUint16(22, true);
+  const inferStride = dv.getUint16(24, true);
+  const flags       = dv.getUint16(26, true);
+  const nextCursor  = dv.getInt32(28, true);
+
+  let off = HEADER_SIZE;
+  const take = (Ctor, n) => { const a = new Ctor(buffer, off, n); off += n * Ctor.BYTES_PER_ELEMENT; return a; };
+  const frameIndex = take(Int32Array,   nFrames);
+  const tMs        = take(Float32Array, nFrames);
+  const trackId    = take(Int32Array,   nBoxes);
+  const xyxy       = take(Int16Array,   nBoxes * 4);
+  const counts     = take(Uint16Array,  nFrames);
+  const clsId      = take(Uint16Array,  nBoxes);
+  const conf       = take(Uint16Array,  nBoxes);
+
+  const decoder  = new TextDecoder();
+  const clsNames = [];
+  for (let i = 0; i < nCls; i++) {
+    const len = dv.getUint16(off, true); off += 2;
+    clsNames.push(decoder.decode(new Uint8Array(buffer, off, len))); off += len;
+  }
+
+  const detections = [];
+  let b = 0;
+  for (let i = 0; i < nFrames; i++) {
+    const dets = [];
+    for (let k = 0; k < counts[i]; k++, b++) {
+      const det = {
+        x1: xyxy[b * 4], y1: xyxy[b * 4 + 1], x2: xyxy[b * 4 + 2], y2: xyxy[b * 4 + 3],
+        cls: clsNames[clsId[b]], conf: Math.round(conf[b] / 65535 * 10000) / 10000,
+      };
+      if (trackId[b] >= 0) det.id = trackId[b];
+      dets.push(det);
+    }
+    detections.push({ frame_index: frameIndex[i], t_ms: tMs[i], detections: dets });
+  }
+
+  return {
+    fps_src:      fpsSrc,
+    frame_w:      frameW,
+    frame_h:      frameH,
+    infer_stride: inferStride,
+    count:        nFrames,
+    next_cursor:  nextCursor < 0 ? null : nextCursor,
+    has_more:     (flags & 1) !== 0,
+    detections,
+  };
+}
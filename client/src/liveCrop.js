@@ -1,4 +1,5 @@
 ﻿import { defineStore } from "pinia";
+import { decodeDetPacked } from "./detPacked";
 
 const API_BASE = `http://${location.hostname}:8000`;
 const WS_BASE  = `ws://${location.hostname}:8000`;
@@ -72,12 +73,13 @@ export const useLiveCropStore = defineStore("liveCrop", {
 
     _startDetWs() {
       if (this._detWs) return;
-      const ws = new WebSocket(`${WS_BASE}/live/ws/det`);
+      const ws = new WebSocket(`${WS_BASE}/live/ws/det?format=bin`);
+      ws.binaryType = "arraybuffer";
       this._detWs = ws;
       ws.onmessage = (evt) => {
         try {
-          const msg    = JSON.parse(evt.data);
-          this.dets    = msg.dets    || [];
+          const msg    = decodeDetPacked(evt.data);
+          this.dets    = msg.detections[0]?.detections || [];
           this.frameW  = msg.frame_w || this.frameW;
           this.frameH  = msg.frame_h || this.frameH;
         } catch {}
@@ -1,8 +1,14 @@
 ﻿import { defineStore } from "pinia";
+import { decodeDetPacked, DET_PACKED_MEDIA_TYPE } from "./detPacked";
 
 const API_BASE = `http://${location.hostname}:8000`;
 const WS_BASE  = `ws://${location.hostname}:8000`;
 
+// playback 오버레이 det 구간 (ms)
+const DET_WINDOW_BEFORE_MS = 10_000;
+const DET_WINDOW_AFTER_MS  = 30_000;
+const DET_WINDOW_MARGIN_MS = 2_000;
+
 export const usePlaybackCropStore = defineStore("playbackCrop", {
   state: () => ({
     videoSrc:  "",
@@ -19,13 +25,17 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
     analyzeProgress: 0,     // 0~100
     analyzeEta:      0,     // 남은 초
     analyzeWritten:  0,     // 저장된 크롭 이미지 수
+    analyzeRemoved:  0,     // SigLIP/heuristic 에서 제거된 크롭 수
     analyzePhase:    "",    // "analyzing" | "zipping" | "done"
     analyzeError:    "",
     _analyzeWs:      null,
 
-    // playback 오버레이용 det 캐시
-    detList:  [],    // [{frame_index, t_ms, detections}]
+    // playback 오버레이용 det 캐시 (현재 재생 위치 주변 구간만 보관)
+    detList:  [],    // [{frame_index, t_ms, detections}]  t_ms 오름차순
     metaInfo: null,  // {fps_src, frame_w, frame_h, infer_stride}
+    detReady:  false,
+    detWindow: null, // {from, to} 현재 detList가 덮는 t_ms 구간
+    _detFetching: false,
 
     // class 출력용
     writtenCounts: {},
@@ -70,6 +80,7 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
             this.videoPath      = data.path;
             this.filename       = data.filename;
             this.uploadProgress = 100;
+            this.probeDetCache();
             resolve(data);
           } catch {
             reject(new Error("upload failed: parse error"));
@@ -100,13 +111,17 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
         this.analyzeProgress = 0;
         this.analyzeEta      = 0;
         this.analyzeWritten  = 0;
+        this.analyzeRemoved  = 0;
         this.analyzePhase    = "analyzing";
         this.analyzeError    = "";
         this.detList         = [];
         this.metaInfo        = null;
+        this.detReady        = false;
+        this.detWindow       = null;
 
         const ws = new WebSocket(`${WS_BASE}/ws/analyze`);
         this._analyzeWs = ws;
+        let streamBlob  = null;   // export_started 때 미리 시작한 다운로드 (stream 모드)
 
         ws.onopen = () => {
           ws.send(JSON.stringify({
@@ -133,6 +148,16 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
             return;
           }
 
+          // ── export_started (stream 모드: 분석 중에 다운로드 시작) ──
+          if (msg.type === "export_started") {
+            streamBlob = fetch(`${API_BASE}${msg.download_url}`).then(res => {
+              if (!res.ok) throw new Error(`HTTP ${res.status}`);
+              return res.blob();
+            });
+            streamBlob.catch(() => {});   // 실패 시 done 에서 다시 받음
+            return;
+          }
+
           // ── progress ──────────────────────────────────
           if (msg.type === "progress") {
             //
@@ -142,6 +167,7 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
             this.analyzeProgress = msg.progress;
             this.analyzeEta      = msg.remaining_sec ?? 0;
             this.analyzeWritten  = msg.written       ?? this.analyzeWritten;
+            this.analyzeRemoved  = msg.siglip_removed ?? this.analyzeRemoved;
             this.analyzePhase    = "analyzing";
             if (msg.recent_crops?.length) this.recentCrops = msg.recent_crops;
             return;
@@ -156,11 +182,6 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
           }
 
           // 처리 과정 관련
-          if (msg.type === "siglip") {
-              this.analyzePhase = "siglip"
-              this.analyzeWritten = msg.written ?? this.analyzeWritten
-              return
-          }
           if (msg.type === "zipping_compress") {
               this.analyzePhase = "zipping_compress"
               return
@@ -171,6 +192,7 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
             this.analyzeProgress = 100;
             this.analyzePhase    = "done";
             this.analyzeWritten  = msg.written ?? this.analyzeWritten;
+            this.analyzeRemoved  = msg.siglip_removed ?? this.analyzeRemoved;
             this._analyzeWs      = null;
             this.writtenCounts    = msg.written_counts ?? {};
 
@@ -182,17 +204,21 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
               this.filteredCrops = [...this.recentCrops]
             }
             
-            // det/all 로드 (playback 오버레이용)
+            // 처음 구간 det 로드 (playback 오버레이용)
             try {
-              await this._fetchDetAll(filename);
+              await this.ensureDetWindow(0);
+              this.detReady = true;
             } catch (e) {
-              console.warn("[playbackCrop] det/all fetch failed:", e);
+              console.warn("[playbackCrop] det/range fetch failed:", e);
             }
 
             // 자동 다운로드
             try {
-              const res  = await fetch(`${API_BASE}${msg.download_url}`);
-              const blob = await res.blob();
+              let blob = streamBlob ? await streamBlob.catch(() => null) : null;
+              if (!blob) {
+                const res = await fetch(`${API_BASE}${msg.download_url}`);
+                blob = await res.blob();
+              }
               const url  = window.URL.createObjectURL(blob);
               const a    = document.createElement("a");
               a.href = url;
@@ -249,22 +275,75 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
       this.isAnalyzing = false;
     },
 
-    // playback 오버레이용 det 전체 로드
-    async _fetchDetAll(filename) {
-      const res = await fetch(`${API_BASE}/det/all?filename=${encodeURIComponent(filename)}`);
-      if (!res.ok) {
-        const err = await res.json().catch(() => ({}));
-        throw new Error(err.detail || "det/all fetch failed");
+    // 업로드 직후 서버 det 캐시 확인 (같은 영상을 다시 올린 경우 재분석 없이 바로 재생 가능)
+    // 캐시가 없으면 /det/range 가 404 → 분석 후에 detReady
+    async probeDetCache() {
+      const filename = this.filename;
+      this.detList   = [];
+      this.detReady  = false;
+      this.detWindow = null;
+      try {
+        await this.ensureDetWindow(0);
+      } catch {
+        return;
+      }
+      if (this.filename === filename && !this.isAnalyzing) {
+        this.detReady = !!this.detWindow;
+      } else {
+        this.detWindow = null;   // 그 사이 분석/다른 업로드가 시작됨 → 그쪽 done 에서 다시 로드
+      }
+    },
+
+    // playback 오버레이용 det 구간 로드
+    // tMs가 현재 구간의 가장자리(DET_WINDOW_MARGIN_MS)에 가까워지면 주변 구간을 새로 받음
+    async ensureDetWindow(tMs) {
+      const w = this.detWindow;
+      if (w) {
+        const nearStart = w.from > 0 && tMs < w.from + DET_WINDOW_MARGIN_MS;
+        const nearEnd   = !w.last    && tMs > w.to   - DET_WINDOW_MARGIN_MS;
+        if (!nearStart && !nearEnd) return;
+      }
+      if (this._detFetching || !this.filename) return;
+
+      this._detFetching = true;
+      try {
+        const from = Math.max(0, tMs - DET_WINDOW_BEFORE_MS);
+        const to   = tMs + DET_WINDOW_AFTER_MS;
+        const list = [];
+        let cursor = null;
+        let data;
+        do {
+          const qs = new URLSearchParams({
+            filename: this.filename, t_from: String(from), t_to: String(to),
+          });
+          if (cursor != null) qs.set("cursor", String(cursor));
+          const res = await fetch(`${API_BASE}/det/range?${qs}`, {
+            headers: { Accept: `${DET_PACKED_MEDIA_TYPE}, application/json` },
+          });
+          if (!res.ok) {
+            const err = await res.json().catch(() => ({}));
+            throw new Error(err.detail || "det/range fetch failed");
+          }
+          data = (res.headers.get("content-type") || "").includes(DET_PACKED_MEDIA_TYPE)
+            ? decodeDetPacked(await res.arrayBuffer())
+            : await res.json();
+          list.push(...(data.detections || []));
+          cursor = data.next_cursor;
+        } while (cursor != null);
+
+        this.metaInfo = {
+          ...this.metaInfo,
+          fps_src:      data.fps_src,
+          frame_w:      data.frame_w,
+          frame_h:      data.frame_h,
+          infer_stride: data.infer_stride,
+        };
+        this.detList   = list;
+        // 서버가 구간 뒤에 프레임이 없다고 하면 영상 끝까지 받은 것
+        this.detWindow = { from, to, last: !data.has_more };
+      } finally {
+        this._detFetching = false;
       }
-      const data = await res.json();
-      this.metaInfo = {
-        ...this.metaInfo,
-        fps_src:      data.fps_src,
-        frame_w:      data.frame_w,
-        frame_h:      data.frame_h,
-        infer_stride: data.infer_stride,
-      };
-      this.detList = data.detections || [];
     },
 
     // ── Reset ───────────────────────────────────────────────
@@ -281,10 +360,14 @@ export const usePlaybackCropStore = defineStore("playbackCrop", {
       this.analyzeProgress = 0;
       this.analyzeEta      = 0;
       this.analyzeWritten  = 0;
+      this.analyzeRemoved  = 0;
       this.analyzePhase    = "";
       this.analyzeError    = "";
       this.detList         = [];
       this.metaInfo        = null;
+      this.detReady        = false;
+      this.detWindow       = null;
+      this._detFetching    = false;
 
       // class 출력용
       this.writtenCounts = {};
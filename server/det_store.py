@@ -0,0 +1,310 @@
+import os
+import json
+import shutil
+import struct
+import hashlib
+import threading
+import time
+import numpy as np
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# =========================
+# 컬럼형 det 저장소 (playback 오버레이용)
+#
+#   영상 1개 = DetTable 1개
+#     frames  : (frame_index, t_ms)              추론한 프레임 수 N, frame_index 오름차순
+#     offsets : int64[N+1]                        frame i 의 박스 = boxes[offsets[i]:offsets[i+1]]
+#     boxes   : (x1, y1, x2, y2, conf, cls_id, track_id)   전체 박스 수 M
+#     cls_names: cls_id → 클래스 이름
+#   track_id 가 없으면 -1.
+# =========================
+FRAME_DTYPE = np.dtype([
+    ("frame_index", "<i4"),
+    ("t_ms",        "<f8"),
+])
+
+BOX_DTYPE = np.dtype([
+    ("x1",       "<i4"), ("y1", "<i4"), ("x2", "<i4"), ("y2", "<i4"),
+    ("conf",     "<f4"),
+    ("cls_id",   "<i2"),
+    ("track_id", "<i4"),
+])
+
+
+class DetTable:
+    def __init__(self, frames: np.ndarray, offsets: np.ndarray, boxes: np.ndarray,
+                 cls_names: List[str]):
+        self.frames    = frames
+        self.offsets   = offsets
+        self.boxes     = boxes
+        self.cls_names = cls_names
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def nbytes(self) -> int:
+        return self.frames.nbytes + self.offsets.nbytes + self.boxes.nbytes
+
+    @classmethod
+    def empty(cls) -> "DetTable":
+        return cls(np.empty(0, FRAME_DTYPE), np.zeros(1, np.int64), np.empty(0, BOX_DTYPE), [])
+
+    @classmethod
+    def concat(cls, tables: List["DetTable"]) -> "DetTable":
+        """여러 테이블(예: 구간 분석 결과)을 frame_index 순으로 합침. cls_id는 이름 기준으로 다시 매김."""
+        tables = [t for t in tables if len(t)]
+        if not tables:
+            return cls.empty()
+
+        name_to_id: Dict[str, int] = {}
+        frames, boxes, counts = [], [], []
+        for t in tables:
+            remap = np.array([name_to_id.setdefault(n, len(name_to_id)) for n in t.cls_names],
+                             dtype=np.int16)
+            b = t.boxes.copy()
+            if len(b):
+                b["cls_id"] = remap[b["cls_id"]]
+            frames.append(t.frames)
+            boxes.append(b)
+            counts.append(np.diff(t.offsets))
+
+        frames = np.concatenate(frames)
+        boxes  = np.concatenate(boxes)
+        counts = np.concatenate(counts)
+        starts = np.zeros(len(counts), np.int64)
+        np.cumsum(counts[:-1], out=starts[1:])
+
+        # frame_index 순으로 정렬하고 박스도 같은 순서로 재배치
+        order   = np.argsort(frames["frame_index"], kind="stable")
+        offsets = np.zeros(len(order) + 1, np.int64)
+        np.cumsum(counts[order], out=offsets[1:])
+        idx = np.arange(offsets[-1]) + np.repeat(starts[order] - offsets[:-1], counts[order])
+        return cls(frames[order], offsets, boxes[idx], list(name_to_id))
+
+    def time_range(self, t_from: float, t_to: Optional[float] = None) -> Tuple[int, int]:
+        """t_from <= t_ms <= t_to 인 프레임 행 범위 [start, stop). t_ms는 frame_index 순이라 정렬되어 있음."""
+        t_ms  = self.frames["t_ms"]
+        start = int(np.searchsorted(t_ms, t_from, side="left"))
+        stop  = len(self) if t_to is None else int(np.searchsorted(t_ms, t_to, side="right"))
+        return start, max(start, stop)
+
+    def frame_dets(self, i: int) -> List[Dict[str, Any]]:
+        """i 번째 프레임의 det dict 리스트 (API 응답용)."""
+        out = []
+        for b in self.boxes[self.offsets[i]:self.offsets[i + 1]].tolist():
+            x1, y1, x2, y2, conf, cls_id, track_id = b
+            det = {"x1": x1, "y1": y1, "x2": x2, "y2": y2,
+                   "cls": self.cls_names[cls_id], "conf": round(conf, 4)}
+            if track_id >= 0:
+                det["id"] = track_id
+            out.append(det)
+        return out
+
+    def to_entries(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """[{frame_index, t_ms, detections}] 형태로 직렬화 (/det/all 응답 포맷)."""
+        stop = len(self) if stop is None else stop
+        return [
+            {"frame_index": int(fi), "t_ms": float(t_ms), "detections": self.frame_dets(i)}
+            for i, (fi, t_ms) in enumerate(self.frames[start:stop].tolist(), start)
+        ]
+
+
+class DetTableBuilder:
+    """프레임 단위로 det dict를 받아 바로 컬럼형으로 변환해 쌓음."""
+
+    def __init__(self):
+        self._frames:  List[tuple] = []
+        self._counts:  List[int]   = []
+        self._boxes:   List[tuple] = []
+        self._name_to_id: Dict[str, int] = {}
+
+    def append(self, frame_index: int, t_ms: float, dets: List[Dict[str, Any]]):
+        self._frames.append((frame_index, t_ms))
+        self._counts.append(len(dets))
+        for d in dets:
+            cls_id = self._name_to_id.setdefault(d.get("cls", ""), len(self._name_to_id))
+            self._boxes.append((d["x1"], d["y1"], d["x2"], d["y2"], d["conf"],
+                                cls_id, d.get("id", -1)))
+
+    def build(self) -> DetTable:
+        frames  = np.array(self._frames, dtype=FRAME_DTYPE)
+        boxes   = np.array(self._boxes,  dtype=BOX_DTYPE)
+        offsets = np.zeros(len(frames) + 1, np.int64)
+        np.cumsum(np.asarray(self._counts, np.int64), out=offsets[1:])
+
+        table = DetTable(frames, offsets, boxes, list(self._name_to_id))
+        if np.any(np.diff(frames["frame_index"]) < 0):
+            return DetTable.concat([table])
+        return table
+
+
+# =========================
+# 영구 det 캐시 (디스크 + 메모리 LRU)
+#
+#   cache_dir/
+#     index.json            filename → entry ("<key>.<version>")
+#     <key>.<version>/frames.npy, offsets.npy, boxes.npy, meta.json
+#   key = sha256(영상 내용 해시 + 모델/threshold 설정). 조회 시 현재 설정으로 만든 key 와 다르면 miss.
+#   put 은 항상 새 version 디렉토리에 쓰고 index.json 교체로 전환 (기존 디렉토리를 지우고 덮어쓰지 않음:
+#   /det/range 가 mmap 으로 열고 있을 수 있음). 더 이상 참조되지 않는 이전 디렉토리는 best-effort 로 삭제하고,
+#   지우지 못한 것(Windows 에서 mmap 중 등)은 다음 시작 때 정리.
+#   메모리에는 max_bytes 한도 안에서 최근 조회한 테이블만 유지하고, 나머지는 조회 시 mmap으로 로드.
+# =========================
+class DetCache:
+    def __init__(self, cache_dir: str = "det_cache", max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir  = cache_dir
+        self.max_bytes  = max_bytes
+        self.lock       = threading.Lock()
+        self._hot: "OrderedDict[str, Tuple[DetTable, Dict[str, Any]]]" = OrderedDict()
+        self._hot_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index: Dict[str, str] = self._load_index()
+        self._remove_unreferenced()
+
+    @staticmethod
+    def make_key(content_hash: str, settings: Dict[str, Any]) -> str:
+        raw = content_hash + json.dumps(settings, sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def put(self, filename: str, key: str, table: DetTable, meta: Dict[str, Any]):
+        entry = f"{key}.{time.time_ns():x}"
+        self._save(entry, table, meta)
+        with self.lock:
+            old = self._index.get(filename)
+            self._index[filename] = entry
+            self._save_index()
+            self._touch(entry, table, meta)
+            stale = old is not None and old not in self._index.values()
+            if stale:
+                dropped = self._hot.pop(old, None)
+                if dropped is not None:
+                    self._hot_bytes -= dropped[0].nbytes
+        if stale:
+            shutil.rmtree(os.path.join(self.cache_dir, old), ignore_errors=True)
+
+    def get(self, filename: str, key: Optional[str] = None) -> Optional[Tuple[DetTable, Dict[str, Any]]]:
+        """key 를 주면 저장된 key 와 같을 때만 반환 (영상 내용이나 모델 설정이 바뀌었으면 None)."""
+        with self.lock:
+            entry = self._index.get(filename)
+            if entry is None or (key is not None and entry.split(".", 1)[0] != key):
+                return None
+            if entry in self._hot:
+                self._hot.move_to_end(entry)
+                return self._hot[entry]
+
+        loaded = self._load(entry)
+        if loaded is None:
+            return None
+        with self.lock:
+            self._touch(entry, *loaded)
+        return loaded
+
+    # ── 내부 ─────────────────────────────────────────────
+    def _touch(self, key, table, meta):
+        old = self._hot.pop(key, None)
+        if old is not None:
+            self._hot_bytes -= old[0].nbytes
+        self._hot[key] = (table, meta)
+        self._hot_bytes += table.nbytes
+        while self._hot_bytes > self.max_bytes and len(self._hot) > 1:
+            _, (evicted, _) = self._hot.popitem(last=False)
+            self._hot_bytes -= evicted.nbytes
+
+    def _save(self, entry, table, meta):
+        final_dir = os.path.join(self.cache_dir, entry)
+        tmp_dir   = f"{final_dir}.tmp{os.getpid()}_{threading.get_ident()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        np.save(os.path.join(tmp_dir, "frames.npy"),  table.frames)
+        np.save(os.path.join(tmp_dir, "offsets.npy"), table.offsets)
+        np.save(os.path.join(tmp_dir, "boxes.npy"),   table.boxes)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(meta, cls_names=table.cls_names), f, ensure_ascii=False)
+        os.replace(tmp_dir, final_dir)   # 새 version 이라 final_dir 은 아직 없음
+
+    def _load(self, entry):
+        d = os.path.join(self.cache_dir, entry)
+        try:
+            with open(os.path.join(d, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            table = DetTable(
+                np.load(os.path.join(d, "frames.npy"),  mmap_mode="r"),
+                np.load(os.path.join(d, "offsets.npy"), mmap_mode="r"),
+                np.load(os.path.join(d, "boxes.npy"),   mmap_mode="r"),
+                meta.pop("cls_names", []),
+            )
+        except (OSError, ValueError) as e:
+            print(f"[DetCache] load failed: {entry} ({e})")
+            return None
+        return table, meta
+
+    def _remove_unreferenced(self):
+        """index 가 가리키지 않는 디렉토리 (이전 version, 중단된 .tmp) 를 best-effort 로 삭제."""
+        live = set(self._index.values())
+        for e in os.scandir(self.cache_dir):
+            if e.is_dir() and e.name not in live:
+                shutil.rmtree(e.path, ignore_errors=True)
+
+    def _load_index(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.cache_dir, "index.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        path = os.path.join(self.cache_dir, "index.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+
+# =========================
+# 바이너리 직렬화 (application/x-det-packed)
+#
+#   little-endian, 헤더 32B 뒤에 컬럼 섹션이 이어짐 (4B 정렬 섹션 → 2B 정렬 섹션 → 이름 순)
+#     0  "DETB"            4  u16 version      6  u16 n_cls
+#     8  u32 n_frames     12  u32 n_boxes     16  f32 fps_src
+#    20  u16 frame_w      22  u16 frame_h     24  u16 infer_stride   26 u16 flags
+#    28  i32 next_cursor (-1 = 없음)
+#   flags bit0 = has_more (요청 구간 뒤에도 프레임이 있음, 영상 끝 판단용)
+#   frame_index i32[N] | t_ms f32[N] | track_id i32[M]
+#   xyxy i16[M*4] | counts u16[N] | cls_id u16[M] | conf u16[M] (conf × 65535)
+#   cls_names: (u16 길이 + utf-8) × n_cls
+# =========================
+DET_PACKED_MEDIA_TYPE = "application/x-det-packed"
+_PACKED_HEADER = struct.Struct("<4sHHIIfHHHHi")
+
+
+def pack_det_table(table: DetTable, start: int = 0, stop: Optional[int] = None,
+                   meta: Optional[Dict[str, Any]] = None,
+                   next_cursor: Optional[int] = None, has_more: bool = False) -> bytes:
+    stop   = len(table) if stop is None else stop
+    meta   = meta or {}
+    frames = table.frames[start:stop]
+    b0, b1 = int(table.offsets[start]), int(table.offsets[stop])
+    boxes  = table.boxes[b0:b1]
+    counts = np.diff(table.offsets[start:stop + 1])
+
+    names = b"".join(struct.pack("<H", len(n.encode())) + n.encode() for n in table.cls_names)
+    xyxy  = np.stack([boxes["x1"], boxes["y1"], boxes["x2"], boxes["y2"]], axis=1)
+
+    return b"".join([
+        _PACKED_HEADER.pack(
+            b"DETB", 1, len(table.cls_names), len(frames), len(boxes),
+            float(meta.get("fps_src", 0.0)), int(meta.get("frame_w", 0)),
+            int(meta.get("frame_h", 0)), int(meta.get("infer_stride", 0)), int(bool(has_more)),
+            -1 if next_cursor is None else int(next_cursor),
+        ),
+        frames["frame_index"].astype("<i4").tobytes(),
+        frames["t_ms"].astype("<f4").tobytes(),
+        boxes["track_id"].astype("<i4").tobytes(),
+        xyxy.astype("<i2").tobytes(),
+        counts.astype("<u2").tobytes(),
+        boxes["cls_id"].astype("<u2").tobytes(),
+        np.rint(np.clip(boxes["conf"], 0, 1) * 65535).astype("<u2").tobytes(),
+        names,
+    ])
@@ -0,0 +1,126 @@
+"""
+검출 모델 백엔드 비교 리포트 (torch .pt vs MODEL_BACKEND export).
+
+영상에서 프레임을 stride 간격으로 뽑아 두 백엔드의 run_ai_inference 결과와 지연 시간을 비교.
+torch 결과를 기준으로 같은 클래스 + IoU >= --iou 인 박스를 매칭해 precision / recall 을 계산.
+모델 설정은 서버와 같은 env(MODEL_KIND / MODEL_PATH / MODEL_IMGSZ / ...)를 따름.
+
+    python detector_compare.py <video> [--backend onnx|openvino] [--frames 200] [--stride 10] [--json out.json]
+"""
+import argparse
+import json
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from server_routes import ModelManager, _iou_matrix
+
+
+def _sample_frames(video_path, n, stride):
+    cap, frames, idx = cv2.VideoCapture(video_path), [], 0
+    while len(frames) < n:
+        if not cap.grab():
+            break
+        idx += 1
+        if idx % stride == 0:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _run(mgr, frames):
+    mgr.run_ai_inference(frames[0])   # warm-up
+    dets, lat = [], []
+    for f in frames:
+        t0 = time.perf_counter()
+        dets.append(mgr.run_ai_inference(f))
+        lat.append((time.perf_counter() - t0) * 1000)
+    return dets, lat
+
+
+def _match(ref, out, iou_thr):
+    """프레임 하나에서 (매칭 수, conf 차이 목록)."""
+    if not ref or not out:
+        return 0, []
+    box = lambda ds: np.array([[d["x1"], d["y1"], d["x2"], d["y2"]] for d in ds], dtype=np.float64)
+    iou = _iou_matrix(box(ref), box(out))
+    same_cls = np.array([[r["cls"] == o["cls"] for o in out] for r in ref])
+    iou[~same_cls] = 0.0
+
+    matched, conf_diff = 0, []
+    for i in np.argsort([-r["conf"] for r in ref]):
+        j = int(iou[i].argmax())
+        if iou[i, j] >= iou_thr:
+            matched += 1
+            conf_diff.append(abs(ref[i]["conf"] - out[j]["conf"]))
+            iou[:, j] = 0.0
+    return matched, conf_diff
+
+
+def _lat_stats(lat):
+    lat = sorted(lat)
+    return {"mean_ms": round(statistics.mean(lat), 2),
+            "p50_ms":  round(lat[len(lat) // 2], 2),
+            "p90_ms":  round(lat[int(len(lat) * 0.9)], 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("video")
+    ap.add_argument("--backend", default="onnx", choices=["onnx", "openvino"])
+    ap.add_argument("--frames", type=int, default=200)
+    ap.add_argument("--stride", type=int, default=10)
+    ap.add_argument("--iou", type=float, default=0.5)
+    ap.add_argument("--json", help="리포트를 JSON 으로 저장할 경로")
+    args = ap.parse_args()
+
+    frames = _sample_frames(args.video, args.frames, args.stride)
+    if not frames:
+        print(f"프레임을 읽지 못함: {args.video}")
+        return
+
+    ref_dets, ref_lat = _run(ModelManager(backend="torch"), frames)
+    out_mgr = ModelManager(backend=args.backend)
+    out_dets, out_lat = _run(out_mgr, frames)
+    if out_mgr.model_backend != args.backend:
+        print(f"[경고] {args.backend} 로드 실패로 {out_mgr.model_backend} 로 실행됨 (비교 무의미)")
+
+    n_ref = sum(len(d) for d in ref_dets)
+    n_out = sum(len(d) for d in out_dets)
+    matched, conf_diff = 0, []
+    for r, o in zip(ref_dets, out_dets):
+        m, cd = _match(r, o, args.iou)
+        matched += m
+        conf_diff += cd
+
+    report = {
+        "frames":  len(frames),
+        "backend": args.backend,
+        "latency": {"torch": _lat_stats(ref_lat), args.backend: _lat_stats(out_lat)},
+        "speedup": round(statistics.mean(ref_lat) / max(statistics.mean(out_lat), 1e-9), 2),
+        "boxes":   {"torch": n_ref, args.backend: n_out, "matched": matched},
+        "recall":    round(matched / n_ref, 4) if n_ref else None,
+        "precision": round(matched / n_out, 4) if n_out else None,
+        "mean_conf_diff": round(statistics.mean(conf_diff), 4) if conf_diff else None,
+    }
+
+    print(f"frames={report['frames']}  backend={args.backend}")
+    for name, st in report["latency"].items():
+        print(f"  {name:9s} mean={st['mean_ms']:7.1f} ms  p50={st['p50_ms']:7.1f} ms  p90={st['p90_ms']:7.1f} ms")
+    print(f"  speedup x{report['speedup']}")
+    print(f"  boxes torch={n_ref} {args.backend}={n_out} matched={matched}  "
+          f"recall={report['recall']} precision={report['precision']} "
+          f"mean|Δconf|={report['mean_conf_diff']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
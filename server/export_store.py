@@ -0,0 +1,90 @@
+import os
+import time
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+import zip_stream
+from zip_stream import PART_SUFFIX
+
+
+# =========================
+# EXPORT_DIR 보관 정책 (janitor)
+#
+#   *.zip       : 완성된 export. 아래 한도를 넘으면 오래된 것부터 삭제
+#                 max_age_s 보다 오래됨 / 개수 > max_count / 총 크기 > max_bytes (0 이면 해당 한도 없음)
+#                 단 grace_s 안에 만들어진 것은 한도를 넘어도 남김 (다운로드 전에 지워지지 않도록)
+#                 ZipStream 이 아직 쓰는 중인 것(zip_stream 에 등록됨)은 streaming 으로 표시하고 삭제하지 않음
+#   *.zip.part  : _zip_dir 가 쓰는 중인 파일 (끝나면 .zip 으로 rename). 오래 안 바뀐 것만 정리 (중단된 export)
+# =========================
+_STALE_PART_S = 3600   # 이 시간 동안 안 바뀐 .part 는 중단된 압축으로 보고 삭제
+
+
+def list_exports(export_dir: str) -> List[Dict[str, Any]]:
+    """export zip 목록 (최신순). 스트리밍 중인 export 는 지금까지 쓰인 크기로 포함."""
+    out = []
+    try:
+        entries = list(os.scandir(export_dir))
+    except FileNotFoundError:
+        return out
+    for e in entries:
+        name = e.name
+        if not name.endswith(".zip") or not e.is_file():
+            continue
+        try:
+            stt = e.stat()
+        except FileNotFoundError:   # 그 사이 삭제됨
+            continue
+        out.append({
+            "name":       name,
+            "size":       stt.st_size,
+            "created_at": datetime.fromtimestamp(stt.st_mtime).isoformat(timespec="seconds"),
+            "mtime":      stt.st_mtime,
+            "streaming":  zip_stream.get_active(name) is not None,
+        })
+    out.sort(key=lambda x: x["mtime"], reverse=True)
+    return out
+
+
+def collect_garbage(export_dir: str, max_age_s: float = 0, max_bytes: int = 0,
+                    max_count: int = 0, grace_s: float = 0) -> List[str]:
+    """한도를 넘는 export 를 오래된 것부터 삭제하고 삭제한 파일 이름 목록을 반환."""
+    now     = time.time()
+    removed = []
+
+    def _remove(name):
+        try:
+            os.remove(os.path.join(export_dir, name))
+            removed.append(name)
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            print(f"[EXPORT GC] 삭제 실패 {name}:", e)
+            return False
+
+    try:
+        parts = [e for e in os.scandir(export_dir) if e.name.endswith(".zip" + PART_SUFFIX)]
+    except FileNotFoundError:
+        return removed
+    for e in parts:
+        try:
+            if now - e.stat().st_mtime > _STALE_PART_S:
+                _remove(e.name)
+        except FileNotFoundError:
+            pass
+
+    exports = list_exports(export_dir)   # 최신순
+    total   = sum(x["size"] for x in exports)
+    kept    = len(exports)
+    for x in reversed(exports):          # 오래된 것부터
+        if x["streaming"] or now - x["mtime"] < grace_s:
+            continue
+        expired = max_age_s > 0 and now - x["mtime"] > max_age_s
+        over    = (max_count > 0 and kept > max_count) or (max_bytes > 0 and total > max_bytes)
+        if not (expired or over):
+            continue
+        if _remove(x["name"]):
+            total -= x["size"]
+            kept  -= 1
+    return removed
@@ -0,0 +1,86 @@
+"""
+서버 cold start import 시간 벤치마크.
+
+새 인터프리터에서 `import server_main` (앱 생성 포함)을 N번 실행해 중앙값을 재고,
+torch / ultralytics 를 먼저 import 하는 경우(= 예전 eager import)와 비교.
+-X importtime 으로 가장 오래 걸린 모듈도 출력.
+
+    python import_bench.py [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    "lazy":  "import server_main",
+    "eager": "import torch, ultralytics; import server_main",
+}
+
+
+def _run(code, env, importtime=False):
+    timer = "import time; _t = time.perf_counter(); "
+    report = "; print(time.perf_counter() - _t)"
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + \
+          ["-c", timer + code + report]
+    p = subprocess.run(cmd, cwd=HERE, env=env, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(p.stderr.strip().splitlines()[-1] if p.stderr else "failed")
+    return float(p.stdout.strip().splitlines()[-1]), p.stderr
+
+
+def _top_modules(importtime_log, top):
+    # "import time: self [us] | cumulative | imported package"
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        # server_main 아래 2단계까지만 (들여쓰기 = 2칸/단계, 앞 1칸은 구분자)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth > 2:
+            continue
+        rows.append((int(cum_us), int(self_us), "  " * depth + name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   VIDEO_DIR=os.path.join(tmp, "videos"),
+                   EXPORT_DIR=os.path.join(tmp, "exports"),
+                   DET_CACHE_DIR=os.path.join(tmp, "det_cache"))
+
+        medians = {}
+        for name, code in SCENARIOS.items():
+            try:
+                _run(code, env)   # 디스크 캐시 예열
+                times = [_run(code, env)[0] for _ in range(args.runs)]
+            except RuntimeError as e:
+                print(f"{name:6s} 실행 실패: {e}")
+                continue
+            medians[name] = statistics.median(times)
+            print(f"{name:6s} median={medians[name] * 1000:8.1f} ms  "
+                  f"min={min(times) * 1000:8.1f} ms  ({args.runs} runs)")
+
+        if "lazy" in medians and "eager" in medians:
+            print(f"startup 개선: {(medians['eager'] - medians['lazy']) * 1000:.1f} ms "
+                  f"({medians['eager'] / max(medians['lazy'], 1e-9):.1f}x)")
+
+        _, log = _run(SCENARIOS["lazy"], env, importtime=True)
+        print(f"\nlazy 기준 import 시간 상위 {args.top} (cumulative):")
+        for cum_us, self_us, mod in _top_modules(log, args.top):
+            print(f"  {cum_us / 1000:8.1f} ms  {mod}")
+
+
+if __name__ == "__main__":
+    main()
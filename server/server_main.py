@@ -1,12 +1,27 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from server_routes import router, AppState, AppConfig
+from server_routes import router, AppState, AppConfig, warm_up_models, run_export_janitor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    st = app.state.app_state
+    # 모델 로드는 백그라운드로 (서버는 바로 요청을 받고, /ready 로 상태 확인)
+    task = asyncio.create_task(warm_up_models(st)) if st.config.warmup_models else None
+    # EXPORT_DIR 보관 한도 정리 (시작 시 1회 + 주기적으로)
+    janitor = asyncio.create_task(run_export_janitor(st))
+    yield
+    janitor.cancel()
+    if task is not None and not task.done():
+        task.cancel()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -26,7 +41,24 @@ def create_app() -> FastAPI:
         video_dir=video_dir,
         target_fps=int(os.getenv("TARGET_FPS", "30")),
         upload_infer_stride=int(os.getenv("UPLOAD_INFER_STRIDE", "10")),
+        upload_infer_batch=int(os.getenv("UPLOAD_INFER_BATCH", "8")),
+        upload_decode_mode=os.getenv("UPLOAD_DECODE_MODE", "grab"),
+        analyze_queue_size=int(os.getenv("ANALYZE_QUEUE_SIZE", "4")),
+        analyze_write_workers=int(os.getenv("ANALYZE_WRITE_WORKERS", "4")),
+        analyze_verify_batch=int(os.getenv("ANALYZE_VERIFY_BATCH", "32")),
+        analyze_pinned_frames=int(os.getenv("ANALYZE_PINNED_FRAMES", "32")),
+        blocking_workers=int(os.getenv("BLOCKING_WORKERS", "8")),
+        analyze_shards=int(os.getenv("ANALYZE_SHARDS", "1")),
+        det_cache_dir=os.getenv("DET_CACHE_DIR", "det_cache"),
+        det_cache_max_mb=int(os.getenv("DET_CACHE_MAX_MB", "256")),
         live_infer_stride=int(os.getenv("LIVE_INFER_STRIDE", "1")),
+        warmup_models=os.getenv("WARMUP_MODELS", "1") == "1",
+        export_mode=os.getenv("EXPORT_MODE", "staged").lower(),
+        export_max_age_h=float(os.getenv("EXPORT_MAX_AGE_HOURS", "72")),
+        export_max_mb=int(os.getenv("EXPORT_MAX_MB", "10240")),
+        export_max_count=int(os.getenv("EXPORT_MAX_COUNT", "50")),
+        export_grace_s=int(os.getenv("EXPORT_GRACE_SECONDS", "900")),
+        export_gc_interval_s=int(os.getenv("EXPORT_GC_INTERVAL", "600")),
     )
 
     app.state.app_state = AppState(config=config)
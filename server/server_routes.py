@@ -2,26 +2,37 @@ import os
 import cv2
 import base64
 import asyncio
+import functools
+import hashlib
 import json
 import time
 import shutil
 import tempfile
 import zipfile
+import queue
+import threading
+import multiprocessing as mp
+from collections import Counter
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from datetime import datetime
 
 from fastapi import APIRouter, UploadFile, WebSocket, WebSocketDisconnect, Request, Body, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, JSONResponse, StreamingResponse
 
-import torch
-from ultralytics import YOLO, RTDETR
+from det_store import DetTable, DetTableBuilder, DetCache, DET_PACKED_MEDIA_TYPE, pack_det_table
+from video_index import VideoIndex, ensure_video_index, seek_to_frame
+import zip_stream
+from zip_stream import ZipStream
+from export_store import PART_SUFFIX, collect_garbage, list_exports
 
-## SigLIP 관련 라이브러리
-from PIL import Image, ImageOps
-from pathlib import Path
+# torch / ultralytics / transformers 는 무거우므로 ModelManager / AmodalVerifier 안에서 필요할 때 import
+# (/health, /manual/*, /export_download 등 모델을 안 쓰는 경로와 --reload 재시작이 빨라짐)
+if TYPE_CHECKING:
+    import torch
 
 router = APIRouter()
 
@@ -34,7 +45,24 @@ class AppConfig:
     video_dir: str = "videos"
     target_fps: int = 30
     upload_infer_stride: int = 10
+    upload_infer_batch: int = 8
+    upload_decode_mode: str = "grab"   # "grab" | "seek"
+    analyze_queue_size: int = 4
+    analyze_write_workers: int = 4
+    analyze_verify_batch: int = 32     # SigLIP 검증 묶음 크기
+    analyze_pinned_frames: int = 32    # 검증/저장 대기 crop 이 붙잡아 둘 수 있는 원본 프레임 수 (메모리 상한)
+    blocking_workers: int = 8
+    analyze_shards: int = 1            # >1 이면 영상을 구간별로 나눠 프로세스 풀에서 분석 (세션별 shards 상한)
+    det_cache_dir: str = "det_cache"
+    det_cache_max_mb: int = 256        # 메모리 hot set 한도
     live_infer_stride: int = 1
+    warmup_models: bool = True         # 앱 시작 시 백그라운드로 검출/검증 모델 로드 + 더미 추론
+    export_mode: str = "staged"        # "staged" (임시 트리 → zip) | "stream" (분석 중 zip 에 바로 기록)
+    export_max_age_h: float = 72       # EXPORT_DIR 보관 한도 (0 이면 한도 없음)
+    export_max_mb: int = 10240
+    export_max_count: int = 50
+    export_grace_s: int = 900          # 이보다 새 export 는 개수/용량 한도를 넘어도 남김
+    export_gc_interval_s: int = 600    # janitor 주기
 
 @dataclass
 class ManualCache:
@@ -47,53 +75,58 @@ class ManualCache:
     last_start_sec: float = 0.0
 
 
-@dataclass
-class DetCache:
-    data:   Dict[str, Dict[int, Any]] = field(default_factory=dict)
-    fps:    Dict[str, float]           = field(default_factory=dict)
-    size:   Dict[str, tuple]           = field(default_factory=dict)
-    stride: Dict[str, int]             = field(default_factory=dict)
-
-
 # =========================
 # Post-NMS / 필터
 # =========================
-def _post_nms(dets: List[Dict], iou_thr: float = 0.4) -> List[Dict]:
-    if len(dets) <= 1:
-        return dets
-    dets = sorted(dets, key=lambda d: d["conf"], reverse=True)
-
-    def iou(a, b):
-        ix1 = max(a["x1"], b["x1"]); iy1 = max(a["y1"], b["y1"])
-        ix2 = min(a["x2"], b["x2"]); iy2 = min(a["y2"], b["y2"])
-        inter = max(0, ix2-ix1) * max(0, iy2-iy1)
-        if inter == 0: return 0.0
-        aa = (a["x2"]-a["x1"]) * (a["y2"]-a["y1"])
-        ab = (b["x2"]-b["x1"]) * (b["y2"]-b["y1"])
-        return inter / (aa + ab - inter)
-
-    keep = []; suppressed = [False] * len(dets)
-    for i in range(len(dets)):
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """xyxy 박스 (N,4) x (M,4) → IoU (N,M)."""
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0]); iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2]); iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union  = area_a[:, None] + area_b[None, :] - inter
+    return np.where(inter > 0, inter / np.where(union > 0, union, 1), 0.0)
+
+
+def _post_nms(xyxy: np.ndarray, conf: np.ndarray, iou_thr: float = 0.4) -> np.ndarray:
+    """conf 내림차순 greedy NMS. 남길 박스의 인덱스를 conf 내림차순으로 반환."""
+    order = np.argsort(-conf, kind="stable")
+    if len(order) <= 1:
+        return order
+    iou = _iou_matrix(xyxy[order], xyxy[order])
+
+    keep = []; suppressed = np.zeros(len(order), dtype=bool)
+    for i in range(len(order)):
         if suppressed[i]: continue
-        keep.append(dets[i])
-        for j in range(i+1, len(dets)):
-            if not suppressed[j] and iou(dets[i], dets[j]) >= iou_thr:
-                suppressed[j] = True
-    return keep
+        keep.append(i)
+        suppressed |= iou[i] >= iou_thr
+    return order[keep]
 
 
-def _filter_large_boxes(dets, frame_w, frame_h, max_area_ratio=0.5):
+def _filter_large_boxes(xyxy: np.ndarray, frame_w, frame_h, max_area_ratio=0.5) -> np.ndarray:
+    """프레임 대비 면적 비율이 max_area_ratio 이하인 박스 mask."""
     fa = frame_w * frame_h
-    return [d for d in dets if (d["x2"]-d["x1"])*(d["y2"]-d["y1"])/fa <= max_area_ratio]
+    return (xyxy[:, 2]-xyxy[:, 0])*(xyxy[:, 3]-xyxy[:, 1])/fa <= max_area_ratio
+
+
+def _to_numpy(t) -> np.ndarray:
+    return t.cpu().numpy() if hasattr(t, "cpu") else np.asarray(t)
 
 
 # =========================
 # ModelManager
 # =========================
+# MODEL_BACKEND → ultralytics export format / 가중치 옆에 캐시되는 산출물 접미사
+_DET_EXPORT_SUFFIX = {"onnx": ".onnx", "openvino": "_openvino_model"}
+
+
 class ModelManager:
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         self.model_kind         = os.getenv("MODEL_KIND", "RTDETR")
         self.model_path         = os.getenv("MODEL_PATH", r"..\AI\JK_2\no3_binary_model_A1004\weights\best.pt")
+        # "torch" (.pt 그대로) | "onnx" | "openvino" (CPU용으로 한 번 export 후 재사용)
+        self.model_backend      = (backend or os.getenv("MODEL_BACKEND", "torch")).lower()
         self.model_imgsz        = int(os.getenv("MODEL_IMGSZ", "640"))
         self.model_conf         = float(os.getenv("MODEL_CONF", "0.5"))
         self.model_iou          = float(os.getenv("MODEL_IOU", "0.3"))
@@ -102,66 +135,132 @@ class ModelManager:
         ## 0: normal, 1: occluded
         _cls = os.getenv("TARGET_CLASSES", "1")
         self.target_classes = [int(c.strip()) for c in _cls.split(",")]
-        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        self.device: Optional[str] = None   # get_model() 에서 결정
         self._model = None
+        self._lock  = threading.Lock()   # warm-up 과 첫 요청이 동시에 로드하지 않도록
 
     def get_model(self):
         if self._model is None:
-            if self.model_kind.upper() == "RTDETR" or "rtdetr" in self.model_path.lower():
-                self._model = RTDETR(self.model_path)
-            else:
-                self._model = YOLO(self.model_path)
-            try: self._model.to(self.device)
-            except: pass
+            with self._lock:
+                if self._model is None:
+                    import torch
+                    model = None
+                    if self.model_backend in _DET_EXPORT_SUFFIX:
+                        self.device = "cpu"
+                        model = self._load_exported()
+                    if model is None:
+                        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+                        model = self._model_cls()(self.model_path)
+                        try: model.to(self.device)
+                        except: pass
+                    self._model = model
         return self._model
 
-    def run_ai_inference(self, frame_bgr) -> List[Dict[str, Any]]:
-        model     = self.get_model()
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        is_rtdetr = self.model_kind.upper() == "RTDETR" or "rtdetr" in self.model_path.lower()
+    def _model_cls(self):
+        from ultralytics import YOLO, RTDETR
+        return RTDETR if self._is_rtdetr() else YOLO
+
+    def _load_exported(self):
+        """
+        export 산출물 로드. RTDETR 는 task 인자를 받지 않고(항상 detect),
+        구버전 ultralytics 의 RTDETR 는 .pt/.yaml 외 포맷을 거부하므로 그때는 torch 로 되돌림 (None).
+        """
+        path = self._exported_weights()
+        if not self._is_rtdetr():
+            return self._model_cls()(path, task="detect")
+        try:
+            return self._model_cls()(path)
+        except NotImplementedError as e:
+            print(f"[MODEL] 설치된 ultralytics 가 {self.model_backend} RT-DETR 로드를 지원하지 않음, "
+                  f"torch 로 실행:", e)
+            self.model_backend = "torch"
+            return None
+
+    def _exported_weights(self) -> str:
+        """MODEL_PATH 를 MODEL_BACKEND 포맷으로 export 한 산출물 경로. 없으면 한 번 export (가중치 옆에 캐시)."""
+        path = os.path.splitext(self.model_path)[0] + _DET_EXPORT_SUFFIX[self.model_backend]
+        if not os.path.exists(path):
+            print(f"[MODEL] {self.model_backend} export 중... ({self.model_path})")
+            path = self._model_cls()(self.model_path).export(
+                format=self.model_backend, imgsz=self.model_imgsz, dynamic=True, half=False)
+        return str(path)
+
+    def cache_settings(self) -> Dict[str, Any]:
+        """det 결과에 영향을 주는 설정 (DetCache 키용)."""
+        return {
+            "model_kind": self.model_kind, "model_path": os.path.basename(self.model_path),
+            "backend": self.model_backend,
+            "imgsz": self.model_imgsz, "conf": self.model_conf, "iou": self.model_iou,
+            "post_nms_iou": self.post_nms_iou, "max_box_area_ratio": self.max_box_area_ratio,
+            "classes": self.target_classes,
+        }
 
-        results = model.predict(
-            source=frame_rgb, imgsz=self.model_imgsz,
-            conf=self.model_conf, iou=self.model_iou,
-            classes=self.target_classes, device=self.device,
-            half=True, verbose=False,
-        ) if is_rtdetr else model.track(
-            source=frame_rgb, imgsz=self.model_imgsz,
+    def _is_rtdetr(self) -> bool:
+        return self.model_kind.upper() == "RTDETR" or "rtdetr" in self.model_path.lower()
+
+    def run_ai_inference(self, frame_bgr) -> List[Dict[str, Any]]:
+        return self.run_ai_inference_batch([frame_bgr])[0]
+
+    def run_ai_inference_batch(self, frames_bgr) -> List[List[Dict[str, Any]]]:
+        """
+        N개 프레임을 한 번의 forward로 추론. 프레임별 det 리스트를 입력 순서대로 반환.
+        YOLO track은 프레임 순서가 중요하므로 프레임 단위로 호출.
+        """
+        if not frames_bgr:
+            return []
+        model      = self.get_model()
+        frames_rgb = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames_bgr]
+        is_rtdetr  = self._is_rtdetr()
+        kwargs     = dict(
+            imgsz=self.model_imgsz,
             conf=self.model_conf, iou=self.model_iou,
             classes=self.target_classes, device=self.device,
-            half=True, verbose=False,
+            half=self.device.startswith("cuda"), verbose=False,   # CPU 에서는 half 무의미
         )
 
-        r0  = results[0]
-        ids = None
+        if is_rtdetr:
+            results = model.predict(source=frames_rgb, **kwargs)
+        else:
+            results = [model.track(source=rgb, **kwargs)[0] for rgb in frames_rgb]
+
+        return [self._result_to_dets(r0, f.shape[1], f.shape[0], is_rtdetr)
+                for r0, f in zip(results, frames_bgr)]
+
+    def _result_to_dets(self, r0, w, h, is_rtdetr) -> List[Dict[str, Any]]:
+        if r0.boxes is None or len(r0.boxes) == 0:
+            return []
+
+        boxes = r0.boxes
+        xyxy  = _to_numpy(boxes.xyxy).reshape(-1, 4)
+        conf  = _to_numpy(boxes.conf).reshape(-1).astype(np.float64)
+        cls   = _to_numpy(boxes.cls).reshape(-1).astype(np.int64)
+        ids   = None
         if not is_rtdetr:
-            try: ids = r0.boxes.id
+            try: ids = _to_numpy(boxes.id).reshape(-1).astype(np.int64) if boxes.id is not None else None
             except: pass
 
-        dets = []
-        if r0.boxes is None or len(r0.boxes) == 0:
-            return dets
+        # 정수 좌표로 clamp 후 NMS / 큰 박스 필터 (텐서 그대로)
+        xyxy = np.rint(xyxy)
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, w-1)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, h-1)
+        xyxy = xyxy.astype(np.int64)
 
+        keep = _post_nms(xyxy, conf, self.post_nms_iou)
+        keep = keep[_filter_large_boxes(xyxy[keep], w, h, self.max_box_area_ratio)]
+
+        # det dict는 최종 결과에만 생성
         names = r0.names
-        h, w  = frame_bgr.shape[:2]
-
-        for i, b in enumerate(r0.boxes):
-            x1, y1, x2, y2 = b.xyxy[0].tolist()
-            conf   = float(b.conf[0].item()) if hasattr(b.conf[0], "item") else float(b.conf[0])
-            cls_id = int(b.cls[0].item())    if hasattr(b.cls[0],  "item") else int(b.cls[0])
-            x1 = max(0, min(w-1, int(round(x1)))); y1 = max(0, min(h-1, int(round(y1))))
-            x2 = max(0, min(w-1, int(round(x2)))); y2 = max(0, min(h-1, int(round(y2))))
+        dets  = []
+        for i in keep.tolist():
+            cls_id = int(cls[i])
             cls_name = names.get(cls_id, str(cls_id)) if isinstance(names, dict) else (
                 names[cls_id] if cls_id < len(names) else str(cls_id))
+            x1, y1, x2, y2 = xyxy[i].tolist()
             det = {"x1": x1, "y1": y1, "x2": x2, "y2": y2,
-                   "cls": str(cls_name), "conf": float(conf)}
+                   "cls": str(cls_name), "conf": float(conf[i])}
             if ids is not None:
-                try: det["id"] = int(ids[i].item())
-                except: pass
+                det["id"] = int(ids[i])
             dets.append(det)
-
-        dets = _post_nms(dets, self.post_nms_iou)
-        dets = _filter_large_boxes(dets, w, h, self.max_box_area_ratio)
         return dets
 
 
@@ -170,30 +269,181 @@ class AppState:
     config:    AppConfig
     manual:    ManualCache  = field(default_factory=ManualCache)
     model_mgr: ModelManager = field(default_factory=ModelManager)
-    det_cache: DetCache      = field(default_factory=DetCache)
+    det_cache: Optional[DetCache] = None
+    executor:  Optional[ThreadPoolExecutor] = None
+    shard_pool: Optional[ProcessPoolExecutor] = None
+    shard_mgr:  Any = None
+    # 모델별 warm-up 상태 (/ready 용): {"state": pending|loading|ready|error, "load_ms", "warmup_ms"}
+    warmup:     Dict[str, Dict[str, Any]] = field(default_factory=lambda: {
+        name: {"state": "pending"} for name in ("detector", "verifier")})
+
+    def __post_init__(self):
+        if self.det_cache is None:
+            self.det_cache = DetCache(self.config.det_cache_dir,
+                                      self.config.det_cache_max_mb * 1024 * 1024)
+        # 추론 / 디코딩 / 디스크 I/O 전용 executor (event loop 블로킹 방지)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.config.blocking_workers,
+                thread_name_prefix="blocking",
+            )
+
+    def get_shard_pool(self) -> ProcessPoolExecutor:
+        # 구간 분석용 프로세스 풀. 워커마다 모델을 한 번만 로드하도록 앱 수명 동안 재사용.
+        if self.shard_pool is None:
+            ctx = mp.get_context("spawn")
+            self.shard_pool = ProcessPoolExecutor(max_workers=self.config.analyze_shards,
+                                                  mp_context=ctx)
+            self.shard_mgr  = ctx.Manager()
+        return self.shard_pool
 
 
 def get_state(request_or_ws) -> AppState:
     return request_or_ws.app.state.app_state
 
 
+async def run_blocking(st: AppState, fn, *args, **kwargs):
+    """블로킹 호출을 st.executor에서 실행하고 결과를 await."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(st.executor, functools.partial(fn, *args, **kwargs))
+
+
+# =========================
+# 모델 warm-up (앱 시작 시 백그라운드)
+# =========================
+def _warm_detector(st: AppState):
+    mgr = st.model_mgr
+    t0  = time.perf_counter()
+    mgr.get_model()
+    t1  = time.perf_counter()
+    mgr.run_ai_inference(np.zeros((mgr.model_imgsz, mgr.model_imgsz, 3), dtype=np.uint8))
+    return t1 - t0, time.perf_counter() - t1
+
+
+def _warm_verifier(st: AppState):
+    t0 = time.perf_counter()
+    verifier = AmodalVerifier.get()
+    t1 = time.perf_counter()
+    size = verifier.input_size
+    verifier._run_vlm_batch([0], np.full((1, size, size, 3), 127, dtype=np.uint8), False)
+    return t1 - t0, time.perf_counter() - t1
+
+
+async def warm_up_models(st: AppState):
+    """검출 모델과 SigLIP을 로드하고 더미 입력으로 한 번씩 돌려 첫 요청 지연을 없앤다."""
+    async def _one(name, fn):
+        info = st.warmup[name]
+        info["state"] = "loading"
+        try:
+            load_s, warm_s = await run_blocking(st, fn, st)
+            info.update(state="ready", load_ms=round(load_s * 1000), warmup_ms=round(warm_s * 1000))
+        except Exception as e:
+            print(f"[WARMUP] {name} 실패:", e)
+            info.update(state="error", error=str(e))
+        print(f"[WARMUP] {name}: {info}")
+
+    await asyncio.gather(_one("detector", _warm_detector), _one("verifier", _warm_verifier))
+
+
+# =========================
+# export janitor (앱 수명 동안 백그라운드, export_store.collect_garbage)
+# =========================
+async def run_export_janitor(st: AppState):
+    cfg        = st.config
+    export_dir = os.getenv("EXPORT_DIR", "exports")
+    while True:
+        try:
+            removed = await run_blocking(
+                st, collect_garbage, export_dir,
+                max_age_s=cfg.export_max_age_h * 3600,
+                max_bytes=cfg.export_max_mb * 1024 * 1024,
+                max_count=cfg.export_max_count,
+                grace_s=cfg.export_grace_s)
+            if removed:
+                print(f"[EXPORT GC] {len(removed)}개 삭제:", removed)
+        except Exception as e:
+            print("[EXPORT GC] 실패:", e)
+        await asyncio.sleep(max(10, cfg.export_gc_interval_s))
+
+
 # =========================
 # Playback crop 헬퍼
 # =========================
 def _ensure_dirs(root):
+    os.makedirs(os.path.join(root, _FRAME_STORE), exist_ok=True)
     for s in ["train", "valid", "test"]:
         os.makedirs(os.path.join(root, s, "images"), exist_ok=True)
         os.makedirs(os.path.join(root, s, "images_full"), exist_ok=True)
         os.makedirs(os.path.join(root, s, "labels"), exist_ok=True)
 
-def _write_dataset_yaml(root):
-    with open(os.path.join(root, "dataset.yaml"), "w") as f:
-        f.write("path: .\ntrain: train/images\nval: valid/images\ntest: test/images\n\n"
-                "names:\n  0: normal_vehicle\n  1: occluded_vehicle")
+def _write_dataset_yaml(sink):
+    sink.write("dataset.yaml",
+               b"path: .\ntrain: train/images\nval: valid/images\ntest: test/images\n\n"
+               b"names:\n  0: normal_vehicle\n  1: occluded_vehicle")
+
+def _write_readme(sink, stats):
+    sink.write("README.txt", "".join(f"- {k}: {v}\n" for k, v in stats.items()).encode("utf-8"))
+
+def _write_metadata(sink, samples):
+    sink.write("metadata.json",
+               json.dumps({"samples": samples}, indent=2, ensure_ascii=False).encode("utf-8"))
+
+def _materialize_full_frames(root, samples):
+    """frame store 의 원본 프레임을 sample 별 images_full/ 에 hardlink (안 되면 복사) 후 store 삭제."""
+    for s in samples:
+        src = _frame_store_path(root, s["frame_index"])
+        dst = os.path.join(root, s["split"], "images_full", f"{s['id']}.jpg")
+        if not os.path.exists(src):
+            continue
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+    shutil.rmtree(os.path.join(root, _FRAME_STORE), ignore_errors=True)
+
+# 이미 압축된 포맷은 deflate 해도 줄지 않으므로 그대로 저장
+_ZIP_STORED_EXT = {".jpg", ".jpeg", ".png"}
+
+def _zip_compress_type(name):
+    ext = os.path.splitext(name)[1].lower()
+    return zipfile.ZIP_STORED if ext in _ZIP_STORED_EXT else zipfile.ZIP_DEFLATED
 
-def _write_readme(root, stats):
-    with open(os.path.join(root, "README.txt"), "w") as f:
-        for k, v in stats.items(): f.write(f"- {k}: {v}\n")
+def _zip_entry(abs_p, arcname):
+    zinfo = zipfile.ZipInfo.from_file(abs_p, arcname)
+    zinfo.compress_type = _zip_compress_type(abs_p)
+    with open(abs_p, "rb") as f:
+        return zinfo, f.read()
+
+def _zip_dir(ds_root, base_dir, zip_path, workers=8):
+    """
+    ds_root 를 zip_path 로 압축. JPEG/PNG 는 ZIP_STORED, 라벨/yaml/json 등만 deflate.
+    파일 읽기는 스레드풀에서 병렬로 (workers*4 개씩, 순서 유지), zip 쓰기는 호출 스레드에서.
+    """
+    paths  = [os.path.join(rd, fn) for rd, _, files in os.walk(ds_root) for fn in files]
+    window = workers * 4
+    # 다 쓸 때까지는 .part 로 (janitor / 다운로드가 쓰는 중인 zip 을 보지 않도록)
+    part_path = zip_path + PART_SUFFIX
+    with zipfile.ZipFile(part_path, "w", zipfile.ZIP_DEFLATED) as zf, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zip-read") as pool:
+        for i in range(0, len(paths), window):
+            futs = [pool.submit(_zip_entry, p, os.path.relpath(p, base_dir))
+                    for p in paths[i:i + window]]
+            for fut in futs:
+                zf.writestr(*fut.result())
+    os.replace(part_path, zip_path)
+
+def _sha256_file(path, chunk_size=1024 * 1024) -> str:
+    with open(path, "rb") as f:
+        return _sha256_fileobj(f, chunk_size)
+
+def _sha256_fileobj(f, chunk_size=1024 * 1024) -> str:
+    h = hashlib.sha256()
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        h.update(chunk)
+    return h.hexdigest()
 
 def _coco_to_occ(cls_name):
     n = (cls_name or "").lower()
@@ -237,24 +487,64 @@ def _clear_dedup_cache(ds_root: str):
 ## =================================================================================
 ## SigLIP 클래스 정의 (검증모델)
 ## =================================================================================
+@functools.lru_cache(maxsize=None)
+def _siglip_image_tower_cls():
+    """torch lazy import 때문에 nn.Module 서브클래스를 처음 필요할 때 정의."""
+    import torch
+
+    class _SiglipImageTower(torch.nn.Module):
+        """uint8 (N, S, S, 3) RGB → L2 정규화된 image embedding. torch 실행 / ONNX export 공용."""
+        def __init__(self, model, mean, std, scale):
+            super().__init__()
+            self.model = model
+            self.scale = scale
+            self.register_buffer("mean", torch.tensor(mean).view(1, 3, 1, 1))
+            self.register_buffer("std",  torch.tensor(std).view(1, 3, 1, 1))
+
+        def forward(self, pixels):
+            x = pixels.permute(0, 3, 1, 2).float() * self.scale
+            x = (x - self.mean) / self.std
+            f = self.model.get_image_features(pixel_values=x)
+            return f / f.norm(dim=-1, keepdim=True)
+
+    return _SiglipImageTower
+
+
 class AmodalVerifier:
     ## --------------------------------------------------------------------------------------------------
     ## 초기화
     ## --------------------------------------------------------------------------------------------------
     _instance = None
+    _lock     = threading.Lock()
     @classmethod
     def get(cls):
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
+        import torch
         from transformers import AutoProcessor, AutoModel
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"[SigLIP] 모델 로드 중... ({self.device.upper()})")
+        # image tower 실행 백엔드: "torch" (HF PyTorch) or "onnx" (ONNX Runtime CPU)
+        self.backend      = (backend or os.getenv("SIGLIP_BACKEND", "torch")).lower()
+        self.onnx_path    = os.getenv("SIGLIP_ONNX_PATH", "siglip_image.onnx")
+        self.onnx_int8    = os.getenv("SIGLIP_ONNX_INT8", "0") == "1"
+        self.onnx_threads = int(os.getenv("SIGLIP_ONNX_THREADS", "4"))
+
+        self.device = "cuda" if torch.cuda.is_available() and self.backend == "torch" else "cpu"
+        print(f"[SigLIP] 모델 로드 중... ({self.backend} / {self.device.upper()})")
         model_id = "google/siglip-base-patch16-224"
         self.model     = AutoModel.from_pretrained(model_id).to(self.device).eval()
         self.processor = AutoProcessor.from_pretrained(model_id)
+        # crop은 입력 해상도로 바로 letterbox, 정규화는 image tower 안에서 수행
+        img_proc        = self.processor.image_processor
+        self.input_size = int(img_proc.size["height"])
+        self._tower     = _siglip_image_tower_cls()(self.model, img_proc.image_mean, img_proc.image_std,
+                                                    float(img_proc.rescale_factor)).to(self.device).eval()
+        self._logit_scale = float(self.model.logit_scale.exp())
+        self._logit_bias  = float(self.model.logit_bias)
         self.positive_prompts = [
             "a clear photo of a car roof visible above a barrier",
             "the top half of a truck or bus peeking over a wall",
@@ -271,6 +561,15 @@ class AmodalVerifier:
             "glowing red rear taillights or brake lights",
             "distorted light streaks and streaky motion blur",
         ]
+        # 프롬프트는 고정이므로 text embedding은 로드 시 한 번만 계산
+        # day 후보 = 앞 n_day개, night 후보 = 전체
+        self._n_day      = len(self.positive_prompts) + len(self.common_negative)
+        self._text_feats = self._encode_texts(
+            self.positive_prompts + self.common_negative + self.night_negative).cpu().numpy()
+        self._ort_sess   = self._load_onnx() if self.backend == "onnx" else None
+        # heuristic 필터용 (cv2 연산은 GIL을 놓으므로 스레드로 충분)
+        self._prefilter_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                                  thread_name_prefix="siglip-prefilter")
 
     ## --------------------------------------------------------------------------------------------------
     ## 메서드
@@ -281,149 +580,269 @@ class AmodalVerifier:
         return (np.count_nonzero(mask) / (hsv_img.shape[0] * hsv_img.shape[1])) * 100
 
     
-    @torch.no_grad()
-    def _run_vlm_batch(self, queue, is_night: bool) -> Dict:
-        paths, images = zip(*queue)
-        candidates = self.positive_prompts + self.common_negative + \
-                     (self.night_negative if is_night else [])
-        inputs = self.processor(
-            text=candidates, images=list(images),
-            padding="max_length", return_tensors="pt"
-        ).to(self.device)
-        logits = self.model(**inputs).logits_per_image
-        probs  = torch.softmax(logits, dim=1)
-        best_indices = probs.argmax(dim=1).tolist()
-        return {path: (best_idx < len(self.positive_prompts))
-                for path, best_idx in zip(paths, best_indices)}
-
-    def _remove_sample(self, img_path: Path, removed_stems: set):
-        stem  = img_path.stem
-        split = img_path.parent.parent.name
-        root  = img_path.parent.parent.parent
-        removed_stems.add(stem)
-        for sub, ext in [("images", ".jpg"), ("images_full", ".jpg"), ("labels", ".txt")]:
-            f = root / split / sub / f"{stem}{ext}"
-            if f.exists():
-                f.unlink()
-
-    def filter_dataset(self, ds_root: str, batch_size: int = 128):
-        image_paths = []
-        for split in ["train", "valid", "test"]:
-            image_paths += list(Path(ds_root, split, "images").glob("*.jpg"))
-
-        total = len(image_paths)
-        if total == 0:
-            return 0, 0, 0, set()
-
-        removed_stems: set = set()
-        day_queue, night_queue = [], []
-
-        for img_path in image_paths:
-            arr    = np.fromfile(str(img_path), np.uint8)
-            cv_img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-            if cv_img is None:
-                self._remove_sample(img_path, removed_stems); continue
-
-            h, w     = cv_img.shape[:2]
-            gray     = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY)
-            is_night = np.mean(gray) < 80
-
-            # heuristic 필터
-            if h < 50 or w < 50:
-                print(f"[REMOVE:abs_size]")
-                self._remove_sample(img_path, removed_stems); continue
-            if cv2.Laplacian(gray, cv2.CV_64F).var() < 30.0:
-                print(f"[REMOVE:blur]")
-                self._remove_sample(img_path, removed_stems); continue
-            if (w / h) < 1.1:
-                print(f"[REMOVE:ratio]")
-                self._remove_sample(img_path, removed_stems); continue
-            if is_night and self._get_red_ratio(
-                    cv2.cvtColor(cv_img, cv2.COLOR_BGR2HSV)) > 5.0:
-                print(f"[REMOVE:red]")
-                self._remove_sample(img_path, removed_stems); continue
-
-            pil_img = Image.fromarray(cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB))
-            max_dim = max(pil_img.size)
-            padded  = ImageOps.pad(pil_img, (max_dim, max_dim), color=(127, 127, 127))
-            (night_queue if is_night else day_queue).append((img_path, padded))
+    def _encode_texts(self, texts) -> "torch.Tensor":
+        import torch
+        inputs = self.processor(text=texts, padding="max_length", return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            feats = self.model.get_text_features(**inputs)
+        return feats / feats.norm(dim=-1, keepdim=True)
+
+    def _export_onnx(self, path):
+        """image tower를 ONNX로 export (batch 축 dynamic)."""
+        import torch
+        print(f"[SigLIP] ONNX export → {path}")
+        dummy = torch.zeros((1, self.input_size, self.input_size, 3), dtype=torch.uint8)
+        torch.onnx.export(self._tower.cpu(), dummy, path,
+                          input_names=["pixels"], output_names=["feats"],
+                          dynamic_axes={"pixels": {0: "n"}, "feats": {0: "n"}},
+                          opset_version=17)
+
+    def _load_onnx(self):
+        import onnxruntime as ort
+        path = self.onnx_path
+        if not os.path.exists(path):
+            self._export_onnx(path)
+        if self.onnx_int8:
+            q_path = os.path.splitext(path)[0] + ".int8.onnx"
+            if not os.path.exists(q_path):
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                quantize_dynamic(path, q_path, weight_type=QuantType.QInt8)
+            path = q_path
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads     = self.onnx_threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        print(f"[SigLIP] ONNX Runtime 세션 로드: {path} (threads={self.onnx_threads})")
+        return ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+
+    def _image_features(self, pixels) -> np.ndarray:
+        if self._ort_sess is not None:
+            return self._ort_sess.run(None, {"pixels": pixels})[0]
+        import torch
+        with torch.no_grad():
+            return self._tower(torch.from_numpy(pixels).to(self.device)).cpu().numpy()
+
+    def _run_vlm_batch(self, keys, pixels, is_night: bool) -> Dict:
+        """keys: sample key 목록, pixels: (N, S, S, 3) uint8 RGB (letterbox 완료)"""
+        text_feats = self._text_feats if is_night else self._text_feats[:self._n_day]
+
+        # image tower만 실행하고 캐시된 text embedding과 logit 계산 (softmax는 argmax에 불필요)
+        img_feats    = self._image_features(pixels)
+        logits       = img_feats @ text_feats.T * self._logit_scale + self._logit_bias
+        best_indices = logits.argmax(axis=1).tolist()
+        return {key: (best_idx < len(self.positive_prompts))
+                for key, best_idx in zip(keys, best_indices)}
+
+    def _prefilter_pixels(self, cv_img):
+        """픽셀 기반 heuristic (blur / 야간 붉은빛). (제거 사유 or None, is_night) 반환."""
+        gray     = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY)
+        is_night = cv2.mean(gray)[0] < 80
+
+        if cv2.Laplacian(gray, cv2.CV_64F).var() < 30.0:
+            return "blur", is_night
+        if is_night and self._get_red_ratio(
+                cv2.cvtColor(cv_img, cv2.COLOR_BGR2HSV)) > 5.0:
+            return "red", is_night
+        return None, is_night
+
+    @staticmethod
+    def _letterbox_into(dst, cv_img):
+        """BGR crop을 비율 유지로 dst(S, S, 3, RGB) 가운데에 리사이즈, 나머지는 회색(127)."""
+        size = dst.shape[0]
+        h, w = cv_img.shape[:2]
+        scale  = size / max(h, w)
+        nw, nh = max(1, round(w * scale)), max(1, round(h * scale))
+        interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        x0, y0 = (size - nw) // 2, (size - nh) // 2
+        dst[:] = 127
+        cv2.cvtColor(cv2.resize(cv_img, (nw, nh), interpolation=interp),
+                     cv2.COLOR_BGR2RGB, dst=dst[y0:y0 + nh, x0:x0 + nw])
+
+    def prefilter(self, crops):
+        """
+        crop 묶음에 heuristic 필터를 한 번에 적용. [(제거 사유 or None, is_night)] 반환.
+        크기/비율은 shape 배열로 한 번에 판정하고, 남은 crop만 픽셀 검사를 풀에서 병렬 처리.
+        """
+        out = [("empty", False)] * len(crops)
+        idx = [i for i, c in enumerate(crops) if c is not None and c.size > 0]
+        if not idx:
+            return out
+
+        hw       = np.array([crops[i].shape[:2] for i in idx], dtype=np.float32)
+        h, w     = hw[:, 0], hw[:, 1]
+        small    = (h < 50) | (w < 50)
+        bad_rat  = ~small & ((w / h) < 1.1)
+
+        rest = []
+        for i, is_small, is_bad_rat in zip(idx, small, bad_rat):
+            if is_small:
+                out[i] = ("abs_size", False)
+            elif is_bad_rat:
+                out[i] = ("ratio", False)
+            else:
+                rest.append(i)
+
+        for i, res in zip(rest, self._prefilter_pool.map(
+                self._prefilter_pixels, [crops[i] for i in rest])):
+            out[i] = res
+        return out
+
+    def verify(self, samples, batch_size: int = 128) -> Dict[Any, Optional[str]]:
+        """
+        메모리 상의 crop들을 heuristic + VLM으로 검증.
+        samples: [(key, crop_bgr)] → {key: 제거 사유 (통과면 None, VLM 탈락이면 "vlm")}
+        """
+        results: Dict[Any, Optional[str]] = {}
+        keys, crops = zip(*samples) if samples else ((), ())
+        checks = self.prefilter(crops)
+
+        # 통과한 crop만 입력 해상도로 letterbox 해서 미리 잡아둔 uint8 버퍼에 채움
+        # (메모리 = 통과 수 × S × S × 3 바이트, crop 원본 크기와 무관)
+        kept   = [i for i, (reason, _) in enumerate(checks) if reason is None]
+        pixels = np.empty((len(kept), self.input_size, self.input_size, 3), dtype=np.uint8)
+        day_rows, night_rows = [], []
+        for row, i in enumerate(kept):
+            self._letterbox_into(pixels[row], crops[i])
+            (night_rows if checks[i][1] else day_rows).append(row)
+        for i, (reason, _) in enumerate(checks):
+            if reason is not None:
+                results[keys[i]] = reason
 
         # VLM 배치 추론
-        for queue, is_night in [(day_queue, False), (night_queue, True)]:
-            for i in range(0, len(queue), batch_size):
-                chunk   = queue[i:i + batch_size]
-                results = self._run_vlm_batch(chunk, is_night)
-                for path, is_pass in results.items():
-                    if not is_pass:
-                        self._remove_sample(path, removed_stems)
-
-        # metadata.json 정합성 재작성
-        meta_path = Path(ds_root) / "metadata.json"
-        if meta_path.exists():
-            with open(meta_path, "r", encoding="utf-8") as f:
-                meta = json.load(f)
-            meta["samples"] = [
-                s for s in meta["samples"] if s["id"] not in removed_stems
-            ]
-            with open(meta_path, "w", encoding="utf-8") as f:
-                json.dump(meta, f, indent=2, ensure_ascii=False)
-
-        passed  = total - len(removed_stems)
-        removed = len(removed_stems)
-        print(f"[SigLIP] total={total} passed={passed} removed={removed}")
-        return total, passed, removed, removed_stems
+        for rows, is_night in [(day_rows, False), (night_rows, True)]:
+            for j in range(0, len(rows), batch_size):
+                sel = rows[j:j + batch_size]
+                passed = self._run_vlm_batch([keys[kept[r]] for r in sel], pixels[sel], is_night)
+                for key, ok in passed.items():
+                    results[key] = None if ok else "vlm"
+        return results
 
 ## =================================================================================
 ## Occ 상황 crop 후 저장하는 함수
 ## =================================================================================
-def _crop_and_save(frame, det, frame_w, frame_h, target_line,
-                   ds_root, img_idx) -> bool:
+def _prepare_crop(frame, det, frame_w, frame_h, target_line, ds_root):
     """
-    det 하나를 amodal(가려진 부분까지 포함한 전체 객체) 크롭하여 저장.
-    성공하면 True, 건너뛰면 False 반환.
+    det 하나를 amodal(가려진 부분까지 포함한 전체 객체) 크롭할지 판정.
+    저장 대상이면 (occ_cls, crop, yolo) 반환, 건너뛰면 None.
+    _is_duplicate 상태를 갱신하므로 프레임 순서대로 호출해야 함.
     """
     occ_cls = _coco_to_occ(det.get("cls"))
     if occ_cls is None:
-        return False, ""
+        return None
 
     ox1, oy1 = int(det["x1"]), int(det["y1"])
     ox2, oy2 = int(det["x2"]), int(det["y2"])
 
     # 중심이 target_line 오른쪽이면 스킵
     if (ox1 + ox2) // 2 > target_line:
-        return False, ""
+        return None
 
     cx1 = max(0, ox1);       cy1 = max(0, oy1)
     cx2 = min(frame_w, ox2); cy2 = min(frame_h, oy2)
 
     if cx2 <= cx1 or cy2 <= cy1:
-        return False, ""
+        return None
 
     crop = frame[cy1:cy2, cx1:cx2]
     if crop.size == 0:
-        return False, ""
+        return None
+
+    yolo = _bbox_to_yolo(ox1, oy1, ox2, oy2, cx1, cy1, cx2-cx1, cy2-cy1)
+    if yolo is None:
+        return None
 
     if _is_duplicate(crop, ds_root):
-        return False, ""
-    
+        return None
+
+    return occ_cls, crop, yolo
+
+
+# 원본 프레임은 프레임당 한 번만 ds_root/_frames/frame_XXXXXXXX.jpg 로 저장하고
+# export 직전에 sample 별 images_full/ 로 hardlink (_materialize_full_frames)
+_FRAME_STORE = "_frames"
+
+
+def _frame_store_path(ds_root, frame_index):
+    return os.path.join(ds_root, _FRAME_STORE, f"frame_{frame_index:08d}.jpg")
+
+
+class _SharedFrame:
+    """한 프레임의 원본 이미지. 같은 프레임의 sample 들이 공유하고 JPEG encode 는 처음 한 번만."""
+    def __init__(self, frame, frame_index):
+        self.frame       = frame
+        self.frame_index = frame_index
+        self._jpeg       = None
+        self._lock       = threading.Lock()
+
+    def jpeg(self) -> Optional[bytes]:
+        with self._lock:
+            if self._jpeg is None:
+                ok, buf = cv2.imencode(".jpg", self.frame)
+                self._jpeg = buf.tobytes() if ok else b""
+            return self._jpeg or None
+
+
+# =========================
+# 데이터셋 저장 대상 (sink). rel 은 데이터셋 루트 기준 "/" 경로
+#   _DirSink : ds_root 아래 파일로 저장 (staged, export 때 _zip_dir 로 압축)
+#   _ZipSink : export zip 에 entry 로 바로 추가 (stream, 임시 트리 없음)
+# =========================
+class _DirSink:
+    def __init__(self, root):
+        self.root   = root
+        self._full  = set()
+        self._lock  = threading.Lock()
+
+    def write(self, rel, data: bytes) -> bool:
+        try:
+            with open(os.path.join(self.root, rel), "wb") as f:
+                f.write(data)
+            return True
+        except OSError:
+            return False
+
+    def write_full_frame(self, shared: _SharedFrame, split, stem):
+        # 프레임당 한 번만 frame store 에 저장 (sample 별 images_full/ 은 _materialize_full_frames)
+        with self._lock:
+            if shared.frame_index in self._full:
+                return
+            self._full.add(shared.frame_index)
+        data = shared.jpeg()
+        if data:
+            self.write(f"{_FRAME_STORE}/frame_{shared.frame_index:08d}.jpg", data)
+
+
+class _ZipSink:
+    def __init__(self, zs: ZipStream, prefix):
+        self.zs     = zs
+        self.prefix = prefix
+
+    def write(self, rel, data: bytes) -> bool:
+        self.zs.write(f"{self.prefix}/{rel}", data, _zip_compress_type(rel))
+        return True
+
+    def write_full_frame(self, shared: _SharedFrame, split, stem):
+        # zip 에는 hardlink 가 없으므로 sample 별 entry 로 (encode 는 프레임당 한 번)
+        data = shared.jpeg()
+        if data:
+            self.write(f"{split}/images_full/{stem}.jpg", data)
+
+
+def _save_crop(shared: _SharedFrame, occ_cls, crop, yolo, sink, img_idx):
+    """
+    _prepare_crop 결과를 sample_XXXXXX 로 저장 (crop / 원본 프레임 / 라벨 / 썸네일).
+    순서와 무관하므로 write 스레드풀에서 병렬로 호출 가능.
+    """
     split = _pick_split(img_idx)
     stem  = f"sample_{img_idx:06d}"
-    img_p = os.path.join(ds_root, split, "images", f"{stem}.jpg")
-    img_full_p = os.path.join(ds_root, split, "images_full", f"{stem}.jpg")
-    lbl_p = os.path.join(ds_root, split, "labels", f"{stem}.txt")
 
-    if not cv2.imwrite(img_p, crop):
+    ok, buf = cv2.imencode(".jpg", crop)
+    if not ok or not sink.write(f"{split}/images/{stem}.jpg", buf.tobytes()):
         return False, ""
 
-    cv2.imwrite(img_full_p, frame)  # 원본 이미지 저장
-
-    yolo = _bbox_to_yolo(ox1, oy1, ox2, oy2, cx1, cy1, cx2-cx1, cy2-cy1)
-    if yolo is None:
-        os.remove(img_p)
-        return False, ""
+    sink.write_full_frame(shared, split, stem)  # 원본 이미지 저장
 
-    with open(lbl_p, "w") as f:
-        f.write(f"{occ_cls} {yolo}\n")
+    sink.write(f"{split}/labels/{stem}.txt", f"{occ_cls} {yolo}\n".encode())
 
     thumb = cv2.resize(crop, (160, 120), interpolation=cv2.INTER_AREA)
     ok_t, buf_t = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, 60])
@@ -431,32 +850,591 @@ def _crop_and_save(frame, det, frame_w, frame_h, target_line,
     return True, thumb_b64
 
 
+## =================================================================================
+## /ws/analyze 파이프라인 (decode → infer → crop → verify → write)
+## =================================================================================
+_PIPE_END = object()
+
+
+class AnalyzePipeline:
+    """
+    decode / infer / crop / verify 스테이지를 각각 스레드로 돌리고 bounded queue로 연결.
+    뒷 스테이지가 밀리면 put()에서 막혀 앞 스테이지도 멈춘다 (backpressure).
+    crop 스테이지는 dedup 판정과 img_idx 부여를 순서대로 하고, crop 배열을 verify_batch개씩 모아
+    verify 스테이지로 넘긴다. crop 이 참조하는 원본 프레임은 저장이 끝날 때까지 메모리에 남으므로
+    그 프레임 수를 pinned_frames 로 제한 (꽉 차면 묶음이 덜 찼어도 먼저 검증으로 넘기고 기다림). verify 스테이지는 검출과 동시에 verifier(SigLIP)로 검증하고
+    통과한 sample만 write_pool에서 encode/write.
+    (crop을 JPEG로 썼다가 다시 읽어 검증하고 지우는 왕복이 없음)
+
+    decode_mode:
+      "grab" - 모든 프레임 grab(), 추론 대상 프레임만 retrieve() (디코딩 비용 ∝ 1/stride)
+      "seek" - 추론 대상 프레임에 바로 seek (stride가 클 때 유리)
+    video_index 가 있으면 seek 위치를 실제 pts 로 보정하고, t_ms 도 실제 pts 를 사용.
+
+    start_frame / end_frame: frame_count 기준 (start_frame, end_frame] 구간만 처리 (구간 분석용).
+
+    out_q 이벤트:
+      ("frame", frame_count, t_ms, dets)                         프레임 순서대로
+      ("samples", [(img_idx, frame_count, t_ms, det, future|None), ...])
+                                                                 검증 묶음 단위, future=None 이면 제거됨
+      ("error", exc)
+      _PIPE_END
+    """
+
+    def __init__(self, cap, model_mgr, *, fps_src, frame_w, frame_h, target_line,
+                 ds_root, infer_stride, infer_batch, decode_mode="grab", sink=None,
+                 start_frame=0, end_frame=None, video_index: Optional[VideoIndex] = None,
+                 verifier=None, verify_batch=32, pinned_frames=32,
+                 queue_size=4, write_workers=4):
+        self.cap          = cap
+        self.model_mgr    = model_mgr
+        self.fps_src      = fps_src
+        self.frame_w      = frame_w
+        self.frame_h      = frame_h
+        self.target_line  = target_line
+        self.ds_root      = ds_root                  # dedup 상태 키 (+ sink 기본값의 저장 위치)
+        self.sink         = sink or _DirSink(ds_root)
+        self.infer_stride = infer_stride
+        self.infer_batch  = infer_batch
+        self.decode_mode  = decode_mode if decode_mode in ("grab", "seek") else "grab"
+        self.start_frame  = start_frame
+        self.end_frame    = end_frame
+        self.video_index  = video_index
+        self.verifier     = verifier
+        self.verify_batch = max(1, verify_batch)
+        self._pinned      = threading.BoundedSemaphore(max(1, pinned_frames))
+        self.removed_reasons: Counter = Counter()   # 제거 사유별 카운트 (verify 스레드만 갱신)
+
+        self.decode_q   = queue.Queue(maxsize=queue_size)                # [(fc, frame)]
+        self.infer_q    = queue.Queue(maxsize=queue_size)                # [((fc, frame), dets)]
+        self.verify_q   = queue.Queue(maxsize=queue_size)                # 검증 대기 crop 묶음
+        self.out_q      = queue.Queue(maxsize=queue_size * infer_batch)  # 프레임 이벤트
+        self.stop_evt   = threading.Event()
+        self.write_pool = ThreadPoolExecutor(max_workers=write_workers,
+                                             thread_name_prefix="analyze-write")
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "AnalyzePipeline":
+        for name, target in [("decode", self._decode_loop),
+                             ("infer",  self._infer_loop),
+                             ("crop",   self._crop_loop),
+                             ("verify", self._verify_loop)]:
+            t = threading.Thread(target=target, name=f"analyze-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self.stop_evt.set()
+        for t in self._threads:
+            t.join(timeout=5.0)
+        self.write_pool.shutdown(wait=True)
+
+    def next_event(self, timeout: float = 0.1):
+        """out_q에서 이벤트 하나. timeout 동안 없으면 None."""
+        try:
+            return self.out_q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    # ── 내부 ─────────────────────────────────────────────
+    def _put(self, q, item) -> bool:
+        while not self.stop_evt.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self.stop_evt.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _PIPE_END
+
+    def _fail(self, e: Exception):
+        self._put(self.out_q, ("error", e))
+        self.stop_evt.set()
+
+    def _iter_sampled_frames(self):
+        """추론 대상 프레임만 (frame_count, frame)으로 yield. frame_count는 1부터."""
+        cap, stride = self.cap, self.infer_stride
+        start, end  = self.start_frame, self.end_frame
+
+        if self.decode_mode == "seek":
+            frame_count, pos = (start // stride + 1) * stride, None
+            while not self.stop_evt.is_set():
+                if end is not None and frame_count > end:
+                    return
+                seek_to_frame(cap, self.video_index, frame_count - 1, pos)
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                pos = frame_count
+                yield frame_count, frame
+                frame_count += stride
+            return
+
+        frame_count = start
+        if start:
+            seek_to_frame(cap, self.video_index, start)
+        while not self.stop_evt.is_set():
+            if end is not None and frame_count >= end:
+                return
+            if not cap.grab():
+                return
+            frame_count += 1
+            if frame_count % stride != 0:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+            yield frame_count, frame
+
+    def _decode_loop(self):
+        try:
+            batch = []
+            for frame_count, frame in self._iter_sampled_frames():
+                batch.append((frame_count, frame))
+                if len(batch) >= self.infer_batch:
+                    if not self._put(self.decode_q, batch):
+                        return
+                    batch = []
+            if batch and not self._put(self.decode_q, batch):
+                return
+            self._put(self.decode_q, _PIPE_END)
+        except Exception as e:
+            self._fail(e)
+
+    def _infer_loop(self):
+        try:
+            while True:
+                batch = self._get(self.decode_q)
+                if batch is _PIPE_END:
+                    break
+                batch_dets = self.model_mgr.run_ai_inference_batch([f for _, f in batch])
+                if not self._put(self.infer_q, list(zip(batch, batch_dets))):
+                    return
+            self._put(self.infer_q, _PIPE_END)
+        except Exception as e:
+            self._fail(e)
+
+    def _crop_loop(self):
+        try:
+            img_idx, pending = 0, []
+            while True:
+                items = self._get(self.infer_q)
+                if items is _PIPE_END:
+                    break
+                for (frame_count, frame), dets in items:
+                    t_ms   = self._t_ms(frame_count)
+                    pinned = False
+                    for det in dets:
+                        prep = _prepare_crop(frame, det, self.frame_w, self.frame_h,
+                                             self.target_line, self.ds_root)
+                        if prep is None:
+                            continue
+                        if not pinned:
+                            if not self._pinned.acquire(blocking=False):
+                                # 대기 중인 묶음을 먼저 넘겨야 자리가 풀림
+                                if pending and not self._put(self.verify_q, pending):
+                                    return
+                                pending = []
+                                if not self._acquire_pin():
+                                    return
+                            pinned = True
+                        pending.append((img_idx, frame_count, t_ms, det, frame, prep))
+                        img_idx += 1
+                    if not self._put(self.out_q, ("frame", frame_count, t_ms, dets)):
+                        return
+                    if len(pending) >= self.verify_batch:
+                        if not self._put(self.verify_q, pending):
+                            return
+                        pending = []
+            if pending and not self._put(self.verify_q, pending):
+                return
+            self._put(self.verify_q, _PIPE_END)
+        except Exception as e:
+            self._fail(e)
+
+    def _acquire_pin(self) -> bool:
+        while not self.stop_evt.is_set():
+            if self._pinned.acquire(timeout=0.1):
+                return True
+        return False
+
+    def _unpin_after(self, futs):
+        """프레임의 저장(futs)이 모두 끝나면 pinned 자리 반납. futs 가 없으면 바로."""
+        if not futs:
+            self._pinned.release()
+            return
+        left, lock = [len(futs)], threading.Lock()
+
+        def _done(_):
+            with lock:
+                left[0] -= 1
+                last = left[0] == 0
+            if last:
+                self._pinned.release()
+        for f in futs:
+            f.add_done_callback(_done)
+
+    def _t_ms(self, frame_count) -> float:
+        idx = self.video_index
+        if idx is not None and 0 < frame_count <= idx.frame_count:
+            return float(idx.pts_ms[frame_count - 1] - idx.pts_ms[0])
+        return (frame_count / self.fps_src) * 1000.0
+
+    def _verify_loop(self):
+        # 검출(crop 스테이지)과 동시에 SigLIP 검증 → 마지막 프레임 직후 바로 종료 가능
+        try:
+            while True:
+                pending = self._get(self.verify_q)
+                if pending is _PIPE_END:
+                    break
+                if not self._verify_and_write(pending):
+                    return
+            self._put(self.out_q, _PIPE_END)
+        except Exception as e:
+            self._fail(e)
+
+    def _verify_and_write(self, pending) -> bool:
+        if self.verifier is not None:
+            reasons = self.verifier.verify([(p[0], p[5][1]) for p in pending], self.verify_batch)
+        else:
+            reasons = {}
+
+        results, shared, futs = [], {}, {}
+        for img_idx, frame_count, t_ms, det, frame, prep in pending:
+            fut    = None
+            reason = reasons.get(img_idx)
+            futs.setdefault(frame_count, [])
+            if reason is None:
+                if frame_count not in shared:
+                    shared[frame_count] = _SharedFrame(frame, frame_count)
+                fut = self.write_pool.submit(_save_crop, shared[frame_count], *prep, self.sink,
+                                             img_idx)
+                futs[frame_count].append(fut)
+            else:
+                self.removed_reasons[reason] += 1
+            results.append((img_idx, frame_count, t_ms, det, fut))
+        for frame_futs in futs.values():
+            self._unpin_after(frame_futs)
+        return self._put(self.out_q, ("samples", results))
+
+
+## =================================================================================
+## 구간(shard) 병렬 분석
+## =================================================================================
+_shard_model_mgr: Optional[ModelManager] = None   # 워커 프로세스당 1개
+
+
+def _shard_ranges(total_frames: int, infer_stride: int, n: int):
+    """
+    [1, total_frames] 를 n개의 (start, end] 구간으로 분할. 경계를 stride 배수에 맞춰
+    구간을 나눠도 추론 대상 프레임이 단일 처리와 같도록 함. 마지막 구간은 EOF까지(None).
+    """
+    n_infer = max(1, total_frames // infer_stride)
+    per     = -(-n_infer // n)
+    ranges  = []
+    for i in range(n):
+        start = i * per * infer_stride
+        if i > 0 and start >= total_frames:
+            break
+        ranges.append((start, (i + 1) * per * infer_stride))
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def _analyze_shard(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ProcessPoolExecutor 워커. 영상의 (start_frame, end_frame] 구간을 분석해 shard_root에 저장.
+    워커 프로세스마다 VideoCapture 1개, ModelManager 1개.
+    sample 번호는 구간 내 로컬 번호(0부터)이며 병합 시 다시 매김.
+    """
+    global _shard_model_mgr
+    if _shard_model_mgr is None:
+        _shard_model_mgr = ModelManager()
+    verifier = AmodalVerifier.get() if job["use_verifier"] else None
+
+    shard_id   = job["shard_id"]
+    shard_root = job["shard_root"]
+    progress_q = job["progress_q"]
+    cancel_evt = job["cancel_evt"]
+    _ensure_dirs(shard_root)
+
+    cap  = cv2.VideoCapture(job["video_path"])
+    pipe = AnalyzePipeline(
+        cap, _shard_model_mgr,
+        fps_src=job["fps_src"], frame_w=job["frame_w"], frame_h=job["frame_h"],
+        target_line=job["target_line"], ds_root=shard_root,
+        infer_stride=job["infer_stride"], infer_batch=job["infer_batch"],
+        decode_mode=job["decode_mode"],
+        start_frame=job["start_frame"], end_frame=job["end_frame"],
+        video_index=ensure_video_index(job["video_path"]),
+        verifier=verifier, verify_batch=job["verify_batch"], pinned_frames=job["pinned_frames"],
+        queue_size=job["queue_size"], write_workers=job["write_workers"],
+    ).start()
+
+    det_builder, samples = DetTableBuilder(), []
+    infer_count, removed = 0, 0
+    try:
+        while not cancel_evt.is_set():
+            ev = pipe.next_event()
+            if ev is None:
+                continue
+            if ev is _PIPE_END:
+                break
+            if ev[0] == "error":
+                raise ev[1]
+
+            if ev[0] == "samples":
+                for img_idx, frame_count, t_ms, det, fut in ev[1]:
+                    ok, thumb_b64 = fut.result() if fut is not None else (False, "")
+                    if not ok:
+                        removed += 1
+                        continue
+                    samples.append({
+                        "idx":           img_idx,
+                        "timestamp_sec": round(t_ms / 1000, 2),
+                        "frame_index":   frame_count,
+                        "class_name":    det.get("cls", ""),
+                        "thumb":         thumb_b64 if len(samples) < 30 else "",
+                    })
+                progress_q.put((shard_id, infer_count, len(samples), removed))
+                continue
+
+            _, frame_count, t_ms, dets = ev
+            det_builder.append(frame_count, t_ms, dets)
+            infer_count += 1
+            progress_q.put((shard_id, infer_count, len(samples), removed))
+    finally:
+        pipe.stop()
+        cap.release()
+        _clear_dedup_cache(shard_root)
+
+    return {"shard_id": shard_id, "shard_root": shard_root, "det_table": det_builder.build(),
+            "samples": samples, "infer_count": infer_count, "removed": removed,
+            "removed_reasons": dict(pipe.removed_reasons)}
+
+
+def _merge_shards(ds_root: str, shard_results: List[Dict[str, Any]]):
+    """
+    구간별 결과를 frame 순서대로 하나의 데이터셋으로 병합.
+    sample_XXXXXX 는 구간 순서 → 구간 내 순서로 0부터 다시 매기고 파일을 이동.
+    """
+    shard_results = sorted(shard_results, key=lambda r: r["shard_id"])
+    det_table     = DetTable.concat([r["det_table"] for r in shard_results])
+    meta_samples, recent_thumbs = [], []
+    img_idx = 0
+    for res in shard_results:
+        for smp in res["samples"]:
+            src_stem, src_split = f"sample_{smp['idx']:06d}", _pick_split(smp["idx"])
+            stem,     split     = f"sample_{img_idx:06d}",    _pick_split(img_idx)
+            for sub, ext in [("images", ".jpg"), ("labels", ".txt")]:
+                src = os.path.join(res["shard_root"], src_split, sub, f"{src_stem}{ext}")
+                if os.path.exists(src):
+                    os.replace(src, os.path.join(ds_root, split, sub, f"{stem}{ext}"))
+
+            meta_samples.append({
+                "id":            stem,
+                "split":         split,
+                "timestamp_sec": smp["timestamp_sec"],
+                "frame_index":   smp["frame_index"],
+                "class_name":    smp["class_name"],
+            })
+            if smp["thumb"] and len(recent_thumbs) < 30:
+                recent_thumbs.append({
+                    "id":         stem,
+                    "class_name": smp["class_name"],
+                    "thumb":      smp["thumb"],
+                })
+            img_idx += 1
+        # frame 번호는 영상 전체 기준이라 구간끼리 겹치지 않음
+        shard_frames = os.path.join(res["shard_root"], _FRAME_STORE)
+        for fn in os.listdir(shard_frames) if os.path.isdir(shard_frames) else []:
+            os.replace(os.path.join(shard_frames, fn), os.path.join(ds_root, _FRAME_STORE, fn))
+        shutil.rmtree(res["shard_root"], ignore_errors=True)
+    return det_table, meta_samples, recent_thumbs
+
+
+def _drain_queue(q, timeout: float = 0.2) -> List[Any]:
+    items = []
+    try:
+        items.append(q.get(timeout=timeout))
+        while True:
+            items.append(q.get_nowait())
+    except queue.Empty:
+        pass
+    return items
+
+
+async def _poll_cancel(ws: WebSocket) -> bool:
+    """취소 메시지가 와 있으면 cancelled 를 보내고 True."""
+    try:
+        msg  = await asyncio.wait_for(ws.receive_text(), timeout=0.001)
+        ctrl = json.loads(msg)
+        if ctrl.get("type") == "control" and ctrl.get("action") == "cancel":
+            await ws.send_text(json.dumps({"type": "cancelled"}))
+            return True
+    except asyncio.TimeoutError:
+        pass
+    return False
+
+
+async def _analyze_sharded(ws: WebSocket, st: AppState, job_base: Dict[str, Any],
+                           ranges, tmp_dir: str, ds_root: str, on_progress):
+    """
+    구간별 _analyze_shard 를 프로세스 풀에 던지고 진행률을 모아 보고, 끝나면 병합.
+    취소되면 None.
+    """
+    pool       = st.get_shard_pool()
+    progress_q = st.shard_mgr.Queue()
+    cancel_evt = st.shard_mgr.Event()
+
+    futures = []
+    for i, (start, end) in enumerate(ranges):
+        job = dict(job_base, shard_id=i, start_frame=start, end_frame=end,
+                   shard_root=os.path.join(tmp_dir, "shards", f"shard_{i:03d}"),
+                   progress_q=progress_q, cancel_evt=cancel_evt)
+        futures.append(asyncio.wrap_future(pool.submit(_analyze_shard, job)))
+
+    shard_infer   = [0] * len(ranges)
+    shard_written = [0] * len(ranges)
+    shard_removed = [0] * len(ranges)
+    try:
+        while not all(f.done() for f in futures):
+            if await _poll_cancel(ws):
+                return None
+            for shard_id, infer_count, written, removed in await run_blocking(st, _drain_queue, progress_q):
+                shard_infer[shard_id]   = infer_count
+                shard_written[shard_id] = written
+                shard_removed[shard_id] = removed
+            await on_progress(sum(shard_infer), sum(shard_written), sum(shard_removed))
+
+        results = [f.result() for f in futures]
+    finally:
+        cancel_evt.set()
+        await asyncio.gather(*futures, return_exceptions=True)
+
+    det_table, meta_samples, recent_thumbs = await run_blocking(st, _merge_shards, ds_root, results)
+    infer_count = sum(r["infer_count"] for r in results)
+    removed     = sum(r["removed"] for r in results)
+    removed_reasons = sum((Counter(r["removed_reasons"]) for r in results), Counter())
+    return det_table, meta_samples, recent_thumbs, infer_count, removed, removed_reasons
+
+
 # =========================
 # 1) 영상 업로드
+#   청크 단위로 디스크에 쓰면서 SHA-256 계산 → 같은 내용이면 기존 파일 재사용
+#   video_dir/.upload_index.json = {sha256: filename}
 # =========================
+_UPLOAD_INDEX      = ".upload_index.json"
+_upload_index_lock = threading.Lock()
+
+
+def _read_upload_index(video_dir) -> Dict[str, str]:
+    try:
+        with open(os.path.join(video_dir, _UPLOAD_INDEX), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _find_upload(video_dir, digest) -> Optional[str]:
+    existing = _read_upload_index(video_dir).get(digest)
+    if existing and os.path.exists(os.path.join(video_dir, existing)):
+        return existing
+    return None
+
+
+def _copy_upload(src, dst_path, chunk_size=1024 * 1024) -> str:
+    """src(file-like)를 chunk 단위로 dst_path 에 쓰면서 SHA-256 계산 (한 번만 읽음). 메모리 사용 = chunk 1개."""
+    h = hashlib.sha256()
+    with open(dst_path, "wb") as dst:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+            dst.write(chunk)
+    return h.hexdigest()
+
+
+def _commit_upload(video_dir, part_path, filename, digest):
+    """
+    임시 파일을 filename 으로 확정. 그 사이 같은 내용이 먼저 올라왔으면
+    (동시 업로드) 임시 파일을 지우고 기존 파일명 반환.
+    """
+    with _upload_index_lock:
+        index    = _read_upload_index(video_dir)
+        existing = _find_upload(video_dir, digest)
+        if existing:
+            os.remove(part_path)
+            return existing, True
+
+        os.replace(part_path, os.path.join(video_dir, filename))
+        index[digest] = filename
+        path = os.path.join(video_dir, _UPLOAD_INDEX)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+        return filename, False
+
+
+def _video_sha256(video_path) -> str:
+    """업로드 때 계산해 둔 해시가 있으면 재사용, 없으면 파일 전체를 해시."""
+    video_dir, name = os.path.split(video_path)
+    for digest, fn in _read_upload_index(video_dir).items():
+        if fn == name:
+            return digest
+    return _sha256_file(video_path)
+
+
+@functools.lru_cache(maxsize=256)
+def _video_sha256_at(video_path, mtime_ns, size) -> str:
+    # det 조회마다 호출되므로 (경로, mtime, 크기) 가 같으면 재사용
+    return _video_sha256(video_path)
+
+
 @router.post("/upload_video")
 async def upload_video(request: Request, file: UploadFile):
     st = get_state(request)
     ts_prefix     = int(time.time() * 1000)
     safe_filename = f"{ts_prefix}_{file.filename}"
-    save_path     = os.path.join(st.config.video_dir, safe_filename)
-    content       = await file.read()
-    with open(save_path, "wb") as f:
-        f.write(content)
+    part_path     = os.path.join(st.config.video_dir, safe_filename + ".part")
+    try:
+        # .part 에 쓰면서 해시 → 이미 있는 내용이면 .part 를 지우고 기존 파일 재사용
+        digest = await run_blocking(st, _copy_upload, file.file, part_path)
+        safe_filename, dedup = await run_blocking(
+            st, _commit_upload, st.config.video_dir, part_path, safe_filename, digest)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    # 프레임 pts / keyframe 인덱스는 백그라운드로 생성 (analyze / manual 에서 재사용)
+    st.executor.submit(ensure_video_index, os.path.join(st.config.video_dir, safe_filename))
     return {
         "message": "upload success",
         "filename": safe_filename,
         "original_filename": file.filename,
-        "path": save_path,
+        "path": os.path.join(st.config.video_dir, safe_filename),
+        "sha256": digest,
+        "deduplicated": dedup,
     }
 
 
 # =========================
 # 2) 추론 + 크롭 동시 처리 WebSocket
 #
-#   클라이언트 → 서버: {filename, infer_stride, left_ratio}
+#   클라이언트 → 서버: {filename, infer_stride, left_ratio, infer_batch?, decode_mode?, shards?,
+#                       export_mode?}
+#     shards 는 프로세스 풀 크기(ANALYZE_SHARDS)를 넘지 못함 (기본 1 → 구간 분석 안 함)
 #   서버 → 클라이언트:
 #     {type:"meta", fps_src, frame_w, frame_h, ...}
+#     {type:"export_started", download_url, zip_name}  ← export_mode="stream" 일 때, 바로 다운로드 가능
 #     {type:"progress", progress, written, remaining_sec}
 #     {type:"zipping"}                     ← ZIP 생성 시작 알림
 #     {type:"done", download_url, zip_name, written}
@@ -468,7 +1446,10 @@ async def analyze_video(ws: WebSocket):
     await ws.accept()
     st      = get_state(ws)
     cap     = None
+    pipe    = None
     tmp_dir = None
+    zs      = None   # 스트리밍 export 중인 zip
+    zip_name = None
 
     try:
         init_msg     = await ws.receive_text()
@@ -476,21 +1457,35 @@ async def analyze_video(ws: WebSocket):
         filename     = (init.get("filename") or "").strip()
         infer_stride = int(init.get("infer_stride") or st.config.upload_infer_stride)
         left_ratio   = float(init.get("left_ratio") or 0.4)
+        infer_batch  = max(1, int(init.get("infer_batch") or st.config.upload_infer_batch))
+        decode_mode  = (init.get("decode_mode") or st.config.upload_decode_mode).lower()
+        # 풀 워커 수보다 많이 나누면 구간들이 한 워커에서 차례로 돌아 단일 파이프라인보다 느려짐
+        shards       = max(1, min(int(init.get("shards") or st.config.analyze_shards),
+                                  st.config.analyze_shards))
+        export_mode  = (init.get("export_mode") or st.config.export_mode).lower()
         video_path   = os.path.join(st.config.video_dir, filename)
 
         if not os.path.exists(video_path):
             await ws.send_text(json.dumps({"type": "error", "message": "file not found"}))
             return
 
-        cap = cv2.VideoCapture(video_path)
+        cap = await run_blocking(st, cv2.VideoCapture, video_path)
         if not cap.isOpened():
             await ws.send_text(json.dumps({"type": "error", "message": "cannot open video"}))
             return
 
-        fps_src      = cap.get(cv2.CAP_PROP_FPS) or float(st.config.target_fps)
-        frame_w      = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)  or 0)
-        frame_h      = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)  or 0)
+        # 업로드 때 만든 인덱스(실제 프레임 수 / pts / keyframe)가 있으면 컨테이너 메타데이터 대신 사용
+        video_index  = await run_blocking(st, ensure_video_index, video_path)
+        if video_index is not None:
+            fps_src      = video_index.fps or float(st.config.target_fps)
+            frame_w      = video_index.width
+            frame_h      = video_index.height
+            total_frames = video_index.frame_count
+        else:
+            fps_src      = cap.get(cv2.CAP_PROP_FPS) or float(st.config.target_fps)
+            frame_w      = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)  or 0)
+            frame_h      = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)  or 0)
         infer_frames = max(1, total_frames // infer_stride)
         target_line  = int(frame_w * left_ratio)
 
@@ -501,88 +1496,53 @@ async def analyze_video(ws: WebSocket):
             "infer_stride": infer_stride, "left_ratio": left_ratio,
         }))
 
-        # 데이터셋 임시 디렉토리 준비
+        # 구간 분석은 shard 별 디렉토리를 합치므로 항상 staged
+        sharded = shards > 1 and total_frames >= shards * infer_stride
+
+        # 데이터셋 저장 위치 준비
         export_dir = os.getenv("EXPORT_DIR", "exports")
         os.makedirs(export_dir, exist_ok=True)
-        tmp_dir     = tempfile.mkdtemp(prefix="occ_export_")
         created_at  = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         ds_name     = f"occ_dataset_{created_at}"
-        ds_root     = os.path.join(tmp_dir, ds_name)
-        os.makedirs(ds_root, exist_ok=True)
-        _ensure_dirs(ds_root)
-        _write_dataset_yaml(ds_root)
+        zip_name    = f"{ds_name}.zip"
+        zip_path    = os.path.join(export_dir, zip_name)
+        if export_mode == "stream" and not sharded:
+            # 임시 트리 없이 export zip 에 entry 를 바로 추가, 다운로드는 지금부터 가능
+            zs      = ZipStream(zip_path)
+            zip_stream.register(zip_name, zs)
+            ds_root = zip_path   # dedup 상태 키로만 사용
+            sink    = _ZipSink(zs, ds_name)
+        else:
+            tmp_dir = tempfile.mkdtemp(prefix="occ_export_")
+            ds_root = os.path.join(tmp_dir, ds_name)
+            os.makedirs(ds_root, exist_ok=True)
+            _ensure_dirs(ds_root)
+            sink    = _DirSink(ds_root)
+        _write_dataset_yaml(sink)
+        if zs is not None:
+            await ws.send_text(json.dumps({
+                "type":         "export_started",
+                "zip_name":     zip_name,
+                "download_url": f"/export_download/{zip_name}",
+            }))
 
-        det_map     = {}   # playback 오버레이용 캐시
+        det_builder = DetTableBuilder()   # playback 오버레이용 캐시
+        removed_ids = []   # SigLIP/heuristic 에서 제거된 sample id
+        # DetCache 키용 영상 해시는 분석과 병렬로 계산
+        hash_task   = asyncio.ensure_future(run_blocking(st, _video_sha256, video_path))
         meta_samples = []   # metadata 저장용 list
         recent_thumbs = []  # 최근 thumb 저장용
-        frame_count = 0
         infer_count = 0
-        img_idx     = 0    # 저장된 이미지 인덱스
         written     = 0    # 저장 성공 수
         t0          = time.time()
-        last_pct    = -1
-
-        while cap.isOpened():
-            # 취소 메시지 확인
-            try:
-                msg  = await asyncio.wait_for(ws.receive_text(), timeout=0.001)
-                ctrl = json.loads(msg)
-                if ctrl.get("type") == "control" and ctrl.get("action") == "cancel":
-                    await ws.send_text(json.dumps({"type": "cancelled"}))
-                    return
-            except asyncio.TimeoutError:
-                pass
-            except WebSocketDisconnect:
-                return
-
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            frame_count += 1
-            if frame_count % infer_stride != 0:
-                continue
+        last_sent   = None
 
-            # ── 추론 ──────────────────────────────────────
-            dets = st.model_mgr.run_ai_inference(frame)
-            t_ms = (frame_count / fps_src) * 1000.0
-
-            # playback 오버레이용 캐시 저장
-            det_map[frame_count] = {"t_ms": t_ms, "detections": dets}
-
-            
-            # ── 추론 결과로 즉시 크롭 저장 ────────────────
-            for det in dets:
-                ok, thumb_b64 = _crop_and_save(
-                    frame, det, frame_w, frame_h, target_line,
-                    ds_root, img_idx,
-                )
-                if ok:
-                    split = _pick_split(img_idx)
-                    meta_samples.append({
-                        "id":            f"sample_{img_idx:06d}",
-                        "split":         split,
-                        "timestamp_sec": round(t_ms / 1000, 2),
-                        "frame_index":   frame_count,
-                        "class_name":    det.get("cls", ""),
-                        # "thumb":         thumb_b64,
-                    })
-
-                    if len(recent_thumbs) < 30:
-                        recent_thumbs.append({
-                            "id":         f"sample_{img_idx:06d}",
-                            "class_name": det.get("cls", ""),
-                            "thumb":      thumb_b64,
-                        })
-                    img_idx += 1
-                    written += 1
-
-            infer_count += 1
-
-            # 진행률 (1% 단위)
+        async def send_progress(infer_count, written, removed):
+            nonlocal last_sent
+            # 진행률 (1% 단위) 또는 SigLIP 카운터가 바뀔 때만 전송
             pct = min(99, int(infer_count / infer_frames * 100))
-            if pct != last_pct:
-                last_pct = pct
+            if (pct, written, removed) != last_sent:
+                last_sent = (pct, written, removed)
                 elapsed  = time.time() - t0
                 fps_est  = infer_count / max(elapsed, 1e-6)
                 eta      = max(0, (infer_frames - infer_count) / max(fps_est, 1e-6))
@@ -591,47 +1551,110 @@ async def analyze_video(ws: WebSocket):
                     "progress":      pct,
                     "written":       written,
                     "remaining_sec": round(eta),
+                    "siglip_passed":  written,
+                    "siglip_removed": removed,
                     "recent_crops":  recent_thumbs,
                 }))
-                await asyncio.sleep(0)  # event loop yield
 
-        # ── 메모리 캐시 저장 (playback 오버레이용) ────────
-        st.det_cache.data[filename]   = det_map
-        st.det_cache.fps[filename]    = fps_src
-        st.det_cache.size[filename]   = (frame_w, frame_h)
-        st.det_cache.stride[filename] = infer_stride
+        if sharded:
+            # ── 구간 병렬 분석 (프로세스 풀) ────────────────
+            job_base = {
+                "video_path": video_path, "fps_src": fps_src,
+                "frame_w": frame_w, "frame_h": frame_h, "target_line": target_line,
+                "infer_stride": infer_stride, "infer_batch": infer_batch,
+                "decode_mode": decode_mode,
+                "use_verifier": True, "verify_batch": st.config.analyze_verify_batch,
+                "pinned_frames": st.config.analyze_pinned_frames,
+                "queue_size": st.config.analyze_queue_size,
+                "write_workers": st.config.analyze_write_workers,
+            }
+            ranges = _shard_ranges(total_frames, infer_stride, shards)
+            res = await _analyze_sharded(ws, st, job_base, ranges, tmp_dir, ds_root,
+                                         send_progress)
+            if res is None:
+                return
+            det_table, meta_samples, recent_thumbs, infer_count, removed, removed_reasons = res
+            written = len(meta_samples)
+        else:
+            # ── decode → infer → crop → verify → write 파이프라인 ──────
+            verifier = await run_blocking(st, AmodalVerifier.get)
+            pipe = AnalyzePipeline(
+                cap, st.model_mgr,
+                fps_src=fps_src, frame_w=frame_w, frame_h=frame_h,
+                target_line=target_line, ds_root=ds_root, sink=sink,
+                infer_stride=infer_stride, infer_batch=infer_batch, decode_mode=decode_mode,
+                video_index=video_index, verifier=verifier, verify_batch=st.config.analyze_verify_batch,
+                pinned_frames=st.config.analyze_pinned_frames,
+                queue_size=st.config.analyze_queue_size,
+                write_workers=st.config.analyze_write_workers,
+            ).start()
+
+            while True:
+                # 취소 메시지 확인
+                if await _poll_cancel(ws):
+                    return
+
+                ev = await run_blocking(st, pipe.next_event)
+                if ev is None:
+                    continue
+                if ev is _PIPE_END:
+                    break
+                if ev[0] == "error":
+                    raise ev[1]
+
+                # ── 검증 + write 결과 수집 ──────────────────
+                if ev[0] == "samples":
+                    for img_idx, frame_count, t_ms, det, fut in ev[1]:
+                        ok, thumb_b64 = await asyncio.wrap_future(fut) if fut is not None else (False, "")
+                        if not ok:
+                            removed_ids.append(f"sample_{img_idx:06d}")
+                            continue
+                        split = _pick_split(img_idx)
+                        meta_samples.append({
+                            "id":            f"sample_{img_idx:06d}",
+                            "split":         split,
+                            "timestamp_sec": round(t_ms / 1000, 2),
+                            "frame_index":   frame_count,
+                            "class_name":    det.get("cls", ""),
+                            # "thumb":         thumb_b64,
+                        })
+
+                        if len(recent_thumbs) < 30:
+                            recent_thumbs.append({
+                                "id":         f"sample_{img_idx:06d}",
+                                "class_name": det.get("cls", ""),
+                                "thumb":      thumb_b64,
+                            })
+                        written += 1
+                    await send_progress(infer_count, written, len(removed_ids))
+                    continue
+
+                _, frame_count, t_ms, dets = ev
+
+                # playback 오버레이용 캐시 저장
+                det_builder.append(frame_count, t_ms, dets)
+
+                infer_count += 1
+                await send_progress(infer_count, written, len(removed_ids))
+
+            det_table = det_builder.build()
+            removed   = len(removed_ids)
+            removed_reasons = pipe.removed_reasons
+
+        removed_reasons = dict(removed_reasons)
+        print(f"[SigLIP] passed={len(meta_samples)} removed={removed} reasons={removed_reasons}")
 
         # ── ZIP 생성 알림
         await ws.send_text(json.dumps({"type": "zipping", "progress": 99, "written": written}))
         await asyncio.sleep(0)
 
-        # ── SigLIP 시작 알림
-        await ws.send_text(json.dumps({"type": "siglip", "written": written}))
-        await asyncio.sleep(0)
-
-        ## ===================================================================================
-        # ── SigLIP 필터링
-        verifier = AmodalVerifier.get()
-        _, passed, removed, removed_ids = await asyncio.to_thread(
-            verifier.filter_dataset, ds_root, 128
-        )
+        # ── SigLIP 필터링은 파이프라인 안에서 crop 단위로 이미 끝남 (별도 단계/알림 없음)
+        passed = len(meta_samples)
 
-        # SigLIP 끈 경우 기본값
-        # passed, removed, removed_ids = written, 0, set()
-        ## ===================================================================================
-        
         # ZIP 압축 시작 알림
         await ws.send_text(json.dumps({"type": "zipping_compress", "written": written}))
         await asyncio.sleep(0)
 
-        # ── 필터링 후 meta_samples 정합성
-        remaining_ids = {
-            p.stem
-            for split in ["train", "valid", "test"]
-            for p in Path(ds_root, split, "images").glob("*.jpg")
-        }
-        meta_samples = [s for s in meta_samples if s["id"] in remaining_ids]
-
         # ── written_counts (필터링 후 기준)
         written_counts: Dict[str, int] = {}
         for s in meta_samples:
@@ -639,26 +1662,39 @@ async def analyze_video(ws: WebSocket):
             written_counts[cls] = written_counts.get(cls, 0) + 1
 
         # ── README 작성
-        _write_readme(ds_root, {
+        await run_blocking(st, _write_readme, sink, {
             "created_at":     created_at,
             "total_images":   len(meta_samples),
             "left_ratio":     left_ratio,
             "splits":         "train:valid:test=8:1:1",
             "siglip_removed": removed,
+            "siglip_removed_reasons": removed_reasons,
         })
 
         # ── metadata.json 작성 (필터링 후)
-        with open(os.path.join(ds_root, "metadata.json"), "w", encoding="utf-8") as f:
-            json.dump({"samples": meta_samples}, f, indent=2, ensure_ascii=False)
-
-        # ── ZIP 압축
-        zip_name = f"{ds_name}.zip"
-        zip_path = os.path.join(export_dir, zip_name)
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for rd, _, files in os.walk(ds_root):
-                for fn in files:
-                    abs_p = os.path.join(rd, fn)
-                    zf.write(abs_p, os.path.relpath(abs_p, tmp_dir))
+        await run_blocking(st, _write_metadata, sink, meta_samples)
+
+        if zs is not None:
+            # ── central directory 기록 → 따라 읽던 다운로드도 여기서 완료
+            await run_blocking(st, zs.close)
+        else:
+            # ── 원본 프레임 → sample 별 images_full/ (hardlink)
+            await run_blocking(st, _materialize_full_frames, ds_root, meta_samples)
+
+            # ── ZIP 압축
+            await run_blocking(st, _zip_dir, ds_root, tmp_dir, zip_path)
+
+        # ── det 캐시 저장 (playback 오버레이용, 디스크 영구 저장) ──
+        # infer_stride 는 key 가 아니라 meta 로 (조회 쪽은 분석 때의 stride 를 모름)
+        # 캐시는 부가 기능이라 실패해도 export 는 완료로 처리
+        try:
+            cache_key = DetCache.make_key(await hash_task, st.model_mgr.cache_settings())
+            await run_blocking(st, st.det_cache.put, filename, cache_key, det_table, {
+                "fps_src": fps_src, "frame_w": frame_w, "frame_h": frame_h,
+                "infer_stride": infer_stride,
+            })
+        except Exception as e:
+            print(f"[DetCache] 저장 실패 ({filename}):", e)
 
         await ws.send_text(json.dumps({
             "type":           "done",
@@ -670,7 +1706,8 @@ async def analyze_video(ws: WebSocket):
             "written_counts": written_counts,
             "siglip_passed":  passed,
             "siglip_removed": removed,
-            "removed_ids": list(removed_ids),
+            "removed_reasons": removed_reasons,
+            "removed_ids":    removed_ids,
         }))
 
     except WebSocketDisconnect:
@@ -680,44 +1717,114 @@ async def analyze_video(ws: WebSocket):
         try: await ws.send_text(json.dumps({"type": "error", "message": str(e)}))
         except: pass
     finally:
+        if pipe is not None:
+            await run_blocking(st, pipe.stop)
         if cap is not None:
             cap.release()
+        if zs is not None:
+            # 정상 종료면 close() 이후라 no-op, 실패/취소면 다운로드 중단 + 파일 삭제
+            await run_blocking(st, zs.abort)
+            zip_stream.unregister(zip_name)
         if tmp_dir:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+            await run_blocking(st, shutil.rmtree, tmp_dir, ignore_errors=True)
         try: await ws.close()
         except: pass
 
 
 # =========================
-# 3) 전체 det 조회 (playback 오버레이용)
+# 3) det 조회 (playback 오버레이용)
+#
+#   /det/all   ?filename=[&cursor=&limit=]              전체 (limit 지정 시 페이지 단위)
+#   /det/range ?filename=&t_from=&t_to=[&cursor=&limit=] t_ms 구간만
+#   cursor는 프레임 행 번호. 응답의 next_cursor가 null이면 마지막 페이지.
+#   has_more 는 요청 구간(t_to) 뒤에 프레임이 더 있는지 (false 면 영상 끝까지 받은 것).
+#   Accept: application/x-det-packed 이면 JSON 대신 바이너리(det_store.pack_det_table) 응답.
 # =========================
-@router.get("/det/all")
-async def get_det_all(request: Request, filename: str):
-    st = get_state(request)
-    det_map = st.det_cache.data.get(filename)
-    if det_map is None:
+def _det_cache_key(st: AppState, video_path: str) -> str:
+    stt = os.stat(video_path)
+    return DetCache.make_key(_video_sha256_at(video_path, stt.st_mtime_ns, stt.st_size),
+                             st.model_mgr.cache_settings())
+
+
+async def _load_det(st: AppState, filename: str):
+    video_path = os.path.join(st.config.video_dir, filename)
+    try:
+        key = await run_blocking(st, _det_cache_key, st, video_path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="video not found")
+    cached = await run_blocking(st, st.det_cache.get, filename, key)
+    if cached is None:
         raise HTTPException(status_code=404, detail="no cache. analyze first.")
+    return cached
+
+
+def _wants_packed(request: Request) -> bool:
+    return DET_PACKED_MEDIA_TYPE in request.headers.get("accept", "")
+
 
-    result = [
-        {"frame_index": fi, "t_ms": entry["t_ms"], "detections": entry["detections"]}
-        for fi, entry in sorted(det_map.items())
-    ]
+async def _det_page(request: Request, st: AppState, filename: str, det_table: DetTable,
+                    meta: Dict[str, Any], start: int, stop: int,
+                    cursor: Optional[int], limit: Optional[int]):
+    if cursor is not None:
+        start = max(start, min(stop, int(cursor)))
+    end = stop if not limit or limit <= 0 else min(stop, start + limit)
+    next_cursor = end if end < stop else None
+
+    has_more = stop < len(det_table)
+    if _wants_packed(request):
+        body = await run_blocking(st, pack_det_table, det_table, start, end, meta, next_cursor,
+                                  has_more)
+        return Response(content=body, media_type=DET_PACKED_MEDIA_TYPE)
+
+    result = await run_blocking(st, det_table.to_entries, start, end)
     return {
         "filename":     filename,
-        "fps_src":      st.det_cache.fps[filename],
-        "frame_w":      st.det_cache.size[filename][0],
-        "frame_h":      st.det_cache.size[filename][1],
-        "infer_stride": st.det_cache.stride[filename],
+        "fps_src":      meta["fps_src"],
+        "frame_w":      meta["frame_w"],
+        "frame_h":      meta["frame_h"],
+        "infer_stride": meta["infer_stride"],
         "count":        len(result),
+        "next_cursor":  next_cursor,
+        "has_more":     has_more,
         "detections":   result,
     }
 
 
+@router.get("/det/all")
+async def get_det_all(request: Request, filename: str,
+                      cursor: Optional[int] = None, limit: Optional[int] = None):
+    st = get_state(request)
+    det_table, meta = await _load_det(st, filename)
+    return await _det_page(request, st, filename, det_table, meta, 0, len(det_table),
+                           cursor, limit)
+
+
+@router.get("/det/range")
+async def get_det_range(request: Request, filename: str, t_from: float = 0.0,
+                        t_to: Optional[float] = None,
+                        cursor: Optional[int] = None, limit: Optional[int] = 1000):
+    st = get_state(request)
+    det_table, meta = await _load_det(st, filename)
+    start, stop = det_table.time_range(t_from, t_to)
+    page = await _det_page(request, st, filename, det_table, meta, start, stop, cursor, limit)
+    if isinstance(page, dict):
+        page.update({"t_from": t_from, "t_to": t_to})
+    return page
+
+
 # =========================
 # 4) ZIP 다운로드
 # =========================
 @router.get("/export_download/{zip_name}")
 async def export_download(zip_name: str):
+    # 아직 쓰는 중인 스트리밍 export 는 쓰인 만큼 따라 읽으며 전송
+    zs = zip_stream.get_active(zip_name)
+    if zs is not None:
+        return StreamingResponse(
+            zs.iter_bytes(), media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{zip_name}"'},
+        )
+
     export_dir = os.getenv("EXPORT_DIR", "exports")
     zip_path   = os.path.join(export_dir, zip_name)
     if not os.path.exists(zip_path):
@@ -728,6 +1835,33 @@ async def export_download(zip_name: str):
     )
 
 
+# =========================
+# 5) export 목록 (최신순, 보관 한도 포함)
+# =========================
+@router.get("/exports")
+async def exports_index(request: Request):
+    st      = get_state(request)
+    cfg     = st.config
+    exports = await run_blocking(st, list_exports, os.getenv("EXPORT_DIR", "exports"))
+    return {
+        "exports": [{
+            "name":         x["name"],
+            "size":         x["size"],
+            "created_at":   x["created_at"],
+            "streaming":    x["streaming"],
+            "download_url": f"/export_download/{x['name']}",
+        } for x in exports],
+        "count":       len(exports),
+        "total_bytes": sum(x["size"] for x in exports),
+        "limits": {
+            "max_age_h": cfg.export_max_age_h,
+            "max_mb":    cfg.export_max_mb,
+            "max_count": cfg.export_max_count,
+            "grace_s":   cfg.export_grace_s,
+        },
+    }
+
+
 # =========================
 # Manual helpers
 # =========================
@@ -766,6 +1900,51 @@ def _convert_roi(roi, frame_w, frame_h, disp_w, disp_h):
     return {"x": x1, "y": y1, "w": max(1, x2 - x1), "h": max(1, y2 - y1)}
 
 
+def _seek_to_sec(cap, video_path, t_sec):
+    """영상 인덱스가 있으면 pts 기준으로 보정한 seek_to_frame, 없으면 CAP_PROP_POS_MSEC."""
+    index = ensure_video_index(video_path)
+    if index is None:
+        cap.set(cv2.CAP_PROP_POS_MSEC, t_sec * 1000.0)
+        return
+    seek_to_frame(cap, index, index.frame_at_ms(index.pts_ms[0] + t_sec * 1000.0))
+
+
+def _read_roi_previews(cap, total_frames, x, y, w, h) -> List[str]:
+    previews: List[str] = []
+
+    for _ in range(total_frames):
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        crop = frame[y:y + h, x:x + w]
+        ok, buffer = cv2.imencode(".jpg", crop, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+        if ok:
+            previews.append(base64.b64encode(buffer).decode())
+        else:
+            previews.append("")
+
+    cap.release()
+    return previews
+
+
+def _save_roi_frames(cap, total_frames, x, y, w, h, save_dir) -> int:
+    saved = 0
+
+    for _ in range(total_frames):
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        crop = frame[y:y + h, x:x + w]
+        bmp_path = os.path.join(save_dir, f"roi_{saved+1:04d}.bmp")
+        cv2.imwrite(bmp_path, crop)
+        saved += 1
+
+    cap.release()
+    return saved
+
+
 # =========================
 # Manual - ROI 추출하기
 # =========================
@@ -807,7 +1986,7 @@ async def manual_extract(request: Request, payload: dict):
     except Exception:
         start_sec = 0.0
 
-    cap = cv2.VideoCapture(video_path)
+    cap = await run_blocking(st, cv2.VideoCapture, video_path)
     if not cap.isOpened():
         return {"ok": False, "error": "cannot open video"}
 
@@ -825,8 +2004,6 @@ async def manual_extract(request: Request, payload: dict):
     else:
         roi_frame = roi
 
-    cap.set(cv2.CAP_PROP_POS_MSEC, start_sec * 1000.0)
-
     total_frames = max(int(round(t_sec_f * fps)), 1)
 
     x = int(roi_frame["x"]); y = int(roi_frame["y"])
@@ -838,21 +2015,11 @@ async def manual_extract(request: Request, payload: dict):
     w = max(1, min(frame_w - x, w))
     h = max(1, min(frame_h - y, h))
 
-    previews: List[str] = []
-
-    for _ in range(total_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        crop = frame[y:y + h, x:x + w]
-        ok, buffer = cv2.imencode(".jpg", crop, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-        if ok:
-            previews.append(base64.b64encode(buffer).decode())
-        else:
-            previews.append("")
-
-    cap.release()
+    try:
+        await run_blocking(st, _seek_to_sec, cap, video_path, start_sec)
+        previews = await run_blocking(st, _read_roi_previews, cap, total_frames, x, y, w, h)
+    finally:
+        cap.release()
 
     st.manual.previews = previews
     st.manual.total = len(previews)
@@ -905,36 +2072,27 @@ async def manual_save(request: Request):
     if (not st.manual.last_video_path) or (not st.manual.last_roi_frame) or (not st.manual.last_t_sec) or (not st.manual.last_save_dir):
         return {"ok": False, "error": "missing cached params"}
 
-    cap = cv2.VideoCapture(st.manual.last_video_path)
+    cap = await run_blocking(st, cv2.VideoCapture, st.manual.last_video_path)
     if not cap.isOpened():
         return {"ok": False, "error": "cannot open video"}
 
-    os.makedirs(st.manual.last_save_dir, exist_ok=True)
-
-    if st.manual.last_start_sec:
-        cap.set(cv2.CAP_PROP_POS_MSEC, float(st.manual.last_start_sec) * 1000.0)
-
     fps = float(st.config.target_fps)
     total_frames = max(int(st.manual.last_t_sec * fps), 1)
 
-    saved = 0
-
     x = st.manual.last_roi_frame["x"]
     y = st.manual.last_roi_frame["y"]
     w = st.manual.last_roi_frame["w"]
     h = st.manual.last_roi_frame["h"]
 
-    for _ in range(total_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        crop = frame[y:y + h, x:x + w]
-        bmp_path = os.path.join(st.manual.last_save_dir, f"roi_{saved+1:04d}.bmp")
-        cv2.imwrite(bmp_path, crop)
-        saved += 1
-
-    cap.release()
+    try:
+        os.makedirs(st.manual.last_save_dir, exist_ok=True)
+        if st.manual.last_start_sec:
+            await run_blocking(st, _seek_to_sec, cap, st.manual.last_video_path,
+                               float(st.manual.last_start_sec))
+        saved = await run_blocking(st, _save_roi_frames, cap, total_frames, x, y, w, h,
+                                   st.manual.last_save_dir)
+    finally:
+        cap.release()
     return {"ok": True, "savedCount": saved, "dir": st.manual.last_save_dir}
 
 # ============================================================================
@@ -945,11 +2103,17 @@ async def health():
     return {"ok": True}
 
 
+@router.get("/ready")
+async def ready(request: Request):
+    # 모델 warm-up 상태. 전부 ready 가 아니면 503 (warm-up 을 끈 경우는 lazy 로드이므로 항상 ready)
+    st = get_state(request)
+    ok = (not st.config.warmup_models) or all(m["state"] == "ready" for m in st.warmup.values())
+    return JSONResponse({"ready": ok, "models": st.warmup}, status_code=200 if ok else 503)
+
+
 # ════════════════════════════════════════════════════════════════
 # 15. Live (GoPro) — 백그라운드 스레드 공유 구조
 # ════════════════════════════════════════════════════════════════
-from fastapi.responses import StreamingResponse
-import threading, tempfile, zipfile
 
 # ── 공유 상태 ────────────────────────────────────────────────
 class LiveState:
@@ -1126,6 +2290,7 @@ def _stop_capture():
 
 # ── MJPEG 스트리밍 ───────────────────────────────────────────
 async def _mjpeg_generator(request: Request):
+    st = get_state(request)
     try:
         while True:
             if await request.is_disconnected():
@@ -1138,7 +2303,8 @@ async def _mjpeg_generator(request: Request):
                 await asyncio.sleep(0.03)
                 continue
 
-            ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            ok, buf = await run_blocking(st, cv2.imencode, ".jpg", frame,
+                                         [cv2.IMWRITE_JPEG_QUALITY, 70])
             if not ok:
                 continue
 
@@ -1168,10 +2334,12 @@ async def live_mjpeg(request: Request):
 
 
 # ── det WebSocket ────────────────────────────────────────────
+#   ?format=bin 이면 바이너리 프레임(det_store.pack_det_table, 프레임 1개)으로 전송
 @router.websocket("/live/ws/det")
 async def live_det_ws(ws: WebSocket):
     await ws.accept()
     st = get_state(ws)
+    packed = ws.query_params.get("format") == "bin"
     _start_capture(st.model_mgr, cap_index=1)
     try:
         while True:
@@ -1180,11 +2348,17 @@ async def live_det_ws(ws: WebSocket):
                 frame_w = live_state.frame_w
                 frame_h = live_state.frame_h
 
-            await ws.send_text(json.dumps({
-                "frame_w": frame_w,
-                "frame_h": frame_h,
-                "dets":    dets,
-            }))
+            if packed:
+                builder = DetTableBuilder()
+                builder.append(0, 0.0, dets)
+                await ws.send_bytes(pack_det_table(
+                    builder.build(), meta={"frame_w": frame_w, "frame_h": frame_h}))
+            else:
+                await ws.send_text(json.dumps({
+                    "frame_w": frame_w,
+                    "frame_h": frame_h,
+                    "dets":    dets,
+                }))
             await asyncio.sleep(1 / 30)
     except WebSocketDisconnect:
         pass
@@ -1198,7 +2372,8 @@ async def live_written():
 
 # ── ZIP 다운로드 ─────────────────────────────────────────────
 @router.post("/live/export")
-async def live_export():
+async def live_export(request: Request):
+    st = get_state(request)
     with live_state.lock:
         ds_root = live_state.ds_root
         ds_name = live_state.ds_name
@@ -1212,11 +2387,7 @@ async def live_export():
     zip_name = f"{ds_name}.zip"
     zip_path   = os.path.join(export_dir, zip_name)
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        for rd, _, files in os.walk(ds_root):
-            for fn in files:
-                abs_p = os.path.join(rd, fn)
-                zf.write(abs_p, os.path.relpath(abs_p, tmp_dir))
+    await run_blocking(st, _zip_dir, ds_root, tmp_dir, zip_path)
 
     return {"download_url": f"/export_download/{zip_name}", "written": written, "zip_name": zip_name}
 
@@ -0,0 +1,81 @@
+"""
+SigLIP 검증 백엔드 parity 체크 (torch vs onnx).
+
+fixture 폴더의 crop 이미지들을 두 백엔드로 verify() 해서 pass/fail 판정이 같은지 비교.
+fixture_dir 를 생략하면 tests/fixtures/siglip (저장소에 포함된 crop 세트, tests/test_siglip_parity.py 도 사용).
+ONNX 설정은 서버와 같은 env(SIGLIP_ONNX_PATH / SIGLIP_ONNX_INT8 / SIGLIP_ONNX_THREADS)를 따름.
+
+    python siglip_parity.py [fixture_dir] [--int8] [--max-mismatch 0.0]
+
+불일치 비율이 --max-mismatch 를 넘으면 exit code 1.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+from server_routes import AmodalVerifier
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "siglip")
+
+
+def _load_fixtures(root):
+    crops = []
+    for rd, _, files in os.walk(root):
+        for fn in sorted(files):
+            if fn.lower().endswith((".jpg", ".jpeg", ".png")):
+                img = cv2.imread(os.path.join(rd, fn))
+                if img is not None:
+                    crops.append((os.path.relpath(os.path.join(rd, fn), root), img))
+    return crops
+
+
+def _timed_verify(verifier, samples, batch_size):
+    t0 = time.perf_counter()
+    res = verifier.verify(samples, batch_size)
+    return res, time.perf_counter() - t0
+
+
+def run_parity(samples, batch_size=32):
+    """torch / onnx 로 각각 verify. VLM 까지 간 sample 중 pass/fail 이 다른 key 목록과 시간."""
+    ref, t_ref = _timed_verify(AmodalVerifier(backend="torch"), samples, batch_size)
+    out, t_out = _timed_verify(AmodalVerifier(backend="onnx"), samples, batch_size)
+
+    # heuristic 단계는 백엔드와 무관하므로 VLM까지 간 sample만 비교
+    vlm_keys = [k for k, _ in samples if ref[k] in (None, "vlm")]
+    mismatch = [k for k in vlm_keys if (ref[k] is None) != (out[k] is None)]
+    return {"ref": ref, "out": out, "vlm_keys": vlm_keys, "mismatch": mismatch,
+            "ratio": len(mismatch) / max(1, len(vlm_keys)), "t_ref": t_ref, "t_out": t_out}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("fixture_dir", nargs="?", default=DEFAULT_FIXTURES)
+    ap.add_argument("--int8", action="store_true", help="int8 동적 양자화 모델로 비교")
+    ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--max-mismatch", type=float, default=0.0, help="허용 불일치 비율 (0~1)")
+    args = ap.parse_args()
+
+    if args.int8:
+        os.environ["SIGLIP_ONNX_INT8"] = "1"
+
+    samples = _load_fixtures(args.fixture_dir)
+    if not samples:
+        print(f"fixture 없음: {args.fixture_dir}")
+        return 2
+
+    rep = run_parity(samples, args.batch)
+    ref, out, mismatch, ratio = rep["ref"], rep["out"], rep["mismatch"], rep["ratio"]
+
+    print(f"samples={len(samples)} vlm={len(rep['vlm_keys'])} mismatch={len(mismatch)} ({ratio:.2%})")
+    print(f"torch={rep['t_ref']:.2f}s onnx{'(int8)' if args.int8 else ''}={rep['t_out']:.2f}s")
+    for k in mismatch:
+        print(f"  [MISMATCH] {k}: torch={'pass' if ref[k] is None else 'fail'} "
+              f"onnx={'pass' if out[k] is None else 'fail'}")
+    return 1 if ratio > args.max_mismatch else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# 서버 모듈은 server/ 를 cwd 로 실행하는 전제라 top-level 로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def server_env(tmp_path, monkeypatch):
+    """VIDEO_DIR / EXPORT_DIR / DET_CACHE_DIR 를 임시 디렉토리로, 모델 warm-up 끔."""
+    dirs = {name: tmp_path / name for name in ("videos", "exports", "det_cache")}
+    for d in dirs.values():
+        d.mkdir()
+    monkeypatch.setenv("VIDEO_DIR",     str(dirs["videos"]))
+    monkeypatch.setenv("EXPORT_DIR",    str(dirs["exports"]))
+    monkeypatch.setenv("DET_CACHE_DIR", str(dirs["det_cache"]))
+    monkeypatch.setenv("WARMUP_MODELS", "0")
+    return dirs
+
+
+def write_synthetic_video(path, frames=120, size=(160, 120), fps=30):
+    """프레임마다 밝기가 바뀌는 mp4 (mp4v)."""
+    w, h = size
+    out  = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for i in range(frames):
+        out.write(np.full((h, w, 3), (i * 2) % 256, dtype=np.uint8))
+    out.release()
+    return path
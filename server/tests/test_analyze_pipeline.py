@@ -0,0 +1,89 @@
+"""AnalyzePipeline: 검증/저장 대기 crop 이 붙잡는 원본 프레임 수가 pinned_frames 를 넘지 않는지."""
+import threading
+import time
+
+import cv2
+
+from conftest import write_synthetic_video
+
+DETS_PER_FRAME = 3
+FRAMES         = 20
+PINNED         = 2
+
+
+class _DetsModel:
+    def run_ai_inference_batch(self, frames_bgr):
+        return [[{"x1": 10 * i, "y1": 10, "x2": 10 * i + 20, "y2": 40, "conf": 0.9, "cls": "car"}
+                 for i in range(DETS_PER_FRAME)] for _ in frames_bgr]
+
+
+class _SlowSink:
+    def __init__(self):
+        self.n, self._lock = 0, threading.Lock()
+
+    def write(self, rel, data):
+        time.sleep(0.002)
+        if "/images/" in rel:
+            with self._lock:
+                self.n += 1
+        return True
+
+    def write_full_frame(self, shared, split, stem):
+        self.write(f"{split}/images_full/{stem}.jpg", b"")
+
+
+class _CountingSemaphore:
+    def __init__(self, n):
+        self._sem, self._lock = threading.BoundedSemaphore(n), threading.Lock()
+        self.held = self.max_held = 0
+
+    def acquire(self, blocking=True, timeout=None):
+        ok = self._sem.acquire(blocking, timeout) if blocking else self._sem.acquire(False)
+        if ok:
+            with self._lock:
+                self.held += 1
+                self.max_held = max(self.max_held, self.held)
+        return ok
+
+    def release(self):
+        with self._lock:
+            self.held -= 1
+        self._sem.release()
+
+
+def test_pinned_frames_bounded(server_env, monkeypatch, tmp_path):
+    import server_routes
+    from server_routes import _PIPE_END, AnalyzePipeline
+
+    # dedup / target_line 과 무관하게 모든 det 를 저장 대상으로
+    monkeypatch.setattr(server_routes, "_prepare_crop",
+                        lambda frame, det, *a: (1, frame[10:40, det["x1"]:det["x2"]], "0 0.5 0.5 1 1"))
+    path = write_synthetic_video(tmp_path / "clip.mp4", frames=FRAMES)
+    cap  = cv2.VideoCapture(str(path))
+    sink = _SlowSink()
+    pipe = AnalyzePipeline(
+        cap, _DetsModel(), fps_src=30, frame_w=160, frame_h=120, target_line=160,
+        ds_root=str(tmp_path / "ds"), sink=sink, infer_stride=1, infer_batch=4,
+        verify_batch=32, pinned_frames=PINNED, write_workers=2,
+    )
+    pipe._pinned = sem = _CountingSemaphore(PINNED)
+    pipe.start()
+    futs, deadline = [], time.time() + 30
+    try:
+        while time.time() < deadline:
+            ev = pipe.next_event()
+            if ev is _PIPE_END:
+                break
+            if ev is not None and ev[0] == "samples":
+                futs += [r[4] for r in ev[1]]
+            assert ev is None or ev[0] != "error", ev
+        else:
+            raise AssertionError("pipeline did not finish")
+        for f in futs:
+            f.result(timeout=10)
+    finally:
+        pipe.stop()
+        cap.release()
+
+    assert len(futs) == sink.n == FRAMES * DETS_PER_FRAME
+    assert sem.max_held <= PINNED and sem.held == 0
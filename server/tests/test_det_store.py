@@ -0,0 +1,33 @@
+"""DetCache: 다시 저장해도 이전에 mmap 으로 읽어 간 테이블이 깨지지 않고, 새 version 으로 전환되는지."""
+import os
+
+from det_store import DetCache, DetTableBuilder
+
+
+def _table(n, conf):
+    b = DetTableBuilder()
+    for i in range(n):
+        b.append(i, i * 33.3, [{"x1": 1, "y1": 2, "x2": 3, "y2": 4, "conf": conf, "cls": "car"}])
+    return b.build()
+
+
+def test_put_over_mapped_entry(tmp_path):
+    cache = DetCache(str(tmp_path), max_bytes=0)   # hot set 없이 항상 mmap 로드
+    key   = DetCache.make_key("sha", {"model": "m"})
+    cache.put("a.mp4", key, _table(5, 0.5), {"infer_stride": 1})
+    cache._hot.clear()
+    mapped, _ = cache.get("a.mp4", key)
+
+    cache.put("a.mp4", key, _table(7, 0.9), {"infer_stride": 2})
+    assert len(mapped) == 5 and float(mapped.boxes["conf"][0]) == 0.5
+
+    cache._hot.clear()
+    table, meta = cache.get("a.mp4", key)
+    assert len(table) == 7 and meta["infer_stride"] == 2
+    assert cache.get("a.mp4", DetCache.make_key("sha", {"model": "other"})) is None
+
+    # 재시작 시 index 가 가리키는 version 만 남음
+    reopened = DetCache(str(tmp_path))
+    dirs     = [e.name for e in os.scandir(tmp_path) if e.is_dir()]
+    assert dirs == [reopened._index["a.mp4"]]
+    assert len(reopened.get("a.mp4", key)[0]) == 7
@@ -0,0 +1,87 @@
+"""
+/ws/analyze 가 도는 동안 /health 가 막히지 않는지 (블로킹 작업이 event loop 밖에서 도는지) 확인.
+검출 모델/검증기는 추론마다 sleep 하는 가짜로 바꿔 분석이 수 초 동안 이어지게 함.
+"""
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import write_synthetic_video
+
+INFER_S      = 0.2    # 가짜 검출기의 프레임당 추론 시간
+HEALTH_MAX_S = 0.15   # 분석 중 /health 한 번의 허용 지연 (추론 한 번이 loop 를 막으면 넘음)
+
+
+class _SlowModelManager:
+    """프레임당 infer_s 만큼 블로킹하는 검출기 (검출 결과는 없음)."""
+    def __init__(self, infer_s):
+        self.infer_s = infer_s
+
+    def run_ai_inference_batch(self, frames_bgr):
+        time.sleep(self.infer_s * len(frames_bgr))
+        return [[] for _ in frames_bgr]
+
+    def run_ai_inference(self, frame_bgr):
+        return self.run_ai_inference_batch([frame_bgr])[0]
+
+    def cache_settings(self):
+        return {"model": "slow-stub"}
+
+
+class _PassVerifier:
+    def verify(self, samples, batch_size):
+        return {key: None for key, _ in samples}
+
+
+@pytest.fixture
+def client(server_env, monkeypatch):
+    import server_main
+    import server_routes
+
+    monkeypatch.setattr(server_routes.AmodalVerifier, "get", staticmethod(lambda: _PassVerifier()))
+    app = server_main.create_app()
+    app.state.app_state.model_mgr = _SlowModelManager(infer_s=INFER_S)
+    write_synthetic_video(server_env["videos"] / "clip.mp4", frames=40)
+    with TestClient(app) as c:
+        yield c
+
+
+def test_health_responsive_during_analysis(client):
+    started, finished = threading.Event(), threading.Event()
+    messages = []
+
+    def _analyze():
+        try:
+            with client.websocket_connect("/ws/analyze") as ws:
+                ws.send_json({"filename": "clip.mp4", "infer_stride": 2, "infer_batch": 1,
+                              "shards": 1})
+                while True:
+                    msg = ws.receive_json()
+                    messages.append(msg["type"])
+                    if msg["type"] == "progress":
+                        started.set()
+                    if msg["type"] in ("done", "error", "cancelled"):
+                        break
+        finally:
+            started.set()
+            finished.set()
+
+    worker = threading.Thread(target=_analyze, daemon=True)
+    worker.start()
+    assert started.wait(timeout=30)
+
+    latencies = []
+    while not finished.is_set() and len(latencies) < 20:
+        t0 = time.perf_counter()
+        assert client.get("/health").json() == {"ok": True}
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(0.05)
+    during_analysis = not finished.is_set()
+
+    worker.join(timeout=60)
+    assert messages[-1] == "done", messages
+    # 측정이 실제로 분석 도중에 이뤄졌어야 의미가 있음
+    assert during_analysis and len(latencies) >= 10
+    assert max(latencies) < HEALTH_MAX_S, latencies
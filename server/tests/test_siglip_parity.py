@@ -0,0 +1,30 @@
+"""
+SigLIP torch / onnx 백엔드 parity (siglip_parity.run_parity 를 tests/fixtures/siglip 에 실행).
+fixture 는 AI/JK_2/no3_binary_model_A1004/val_batch0_labels.jpg 에서 잘라낸 crop (+ 야간/blur 변형).
+onnxruntime / torch / transformers 가 없거나 SigLIP 가중치가 로컬 HF 캐시에 없으면 skip.
+onnx export 산출물은 tmp 에 만들어 저장소의 siglip_image.onnx 와 섞이지 않게 함.
+"""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+hf_hub = pytest.importorskip("huggingface_hub")
+
+MODEL_ID = "google/siglip-base-patch16-224"
+
+
+def test_onnx_matches_torch_on_fixtures(tmp_path, monkeypatch):
+    if not isinstance(hf_hub.try_to_load_from_cache(MODEL_ID, "config.json"), str):
+        pytest.skip(f"{MODEL_ID} 가 로컬 HF 캐시에 없음")
+    monkeypatch.setenv("SIGLIP_ONNX_PATH", str(tmp_path / "siglip_image.onnx"))
+    monkeypatch.setenv("SIGLIP_ONNX_INT8", "0")
+
+    import siglip_parity
+
+    samples = siglip_parity._load_fixtures(siglip_parity.DEFAULT_FIXTURES)
+    assert len(samples) >= 10
+
+    rep = siglip_parity.run_parity(samples)
+    assert rep["vlm_keys"], "VLM 단계까지 간 fixture 가 없음"
+    assert not rep["mismatch"], rep["mismatch"]
@@ -0,0 +1,46 @@
+"""video_index 로 seek 할 때 영상 끝(duration) 이후를 요청해도 예외 없이 '읽을 프레임 없음' 이 되는지."""
+import cv2
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import write_synthetic_video
+from video_index import build_video_index, seek_to_frame
+
+FRAMES, FPS = 300, 30
+DURATION_S  = FRAMES / FPS
+
+
+@pytest.fixture
+def clip(server_env):
+    return write_synthetic_video(server_env["videos"] / "clip.mp4", frames=FRAMES, fps=FPS)
+
+
+@pytest.mark.parametrize("t_sec", [DURATION_S, DURATION_S + 1])
+def test_seek_past_end_reads_nothing(clip, t_sec):
+    index = build_video_index(str(clip))
+    assert index.frame_count == FRAMES
+    target = index.frame_at_ms(index.pts_ms[0] + t_sec * 1000.0)
+    assert target >= index.frame_count
+
+    cap = cv2.VideoCapture(str(clip))
+    try:
+        seek_to_frame(cap, index, target)
+        assert not cap.read()[0]
+    finally:
+        cap.release()
+
+
+@pytest.mark.parametrize("start_sec, expect_frames", [
+    (DURATION_S / 2, True), (DURATION_S, False), (DURATION_S + 1, False)])
+def test_manual_extract_near_end(clip, tmp_path, start_sec, expect_frames):
+    import server_main
+
+    with TestClient(server_main.create_app()) as c:
+        res = c.post("/manual/extract", json={
+            "videoPath": str(clip), "roi": {"x": 0, "y": 0, "w": 32, "h": 32},
+            "t": 1.0, "currentTimeSec": start_sec, "saveDir": str(tmp_path / "out"),
+        })
+    assert res.status_code == 200
+    body = res.json()
+    assert body["ok"]
+    assert (body["total"] > 0) == expect_frames
@@ -0,0 +1,46 @@
+"""스트리밍 export: 최종 이름에 바로 쓰고(rename 없음), 쓰는 동안은 목록에 streaming 으로만 보이고 GC 되지 않는지."""
+import io
+import os
+import time
+import zipfile
+
+import zip_stream
+from export_store import collect_garbage, list_exports
+from zip_stream import ZipStream
+
+
+def test_stream_written_in_place_and_protected(tmp_path):
+    name = "occ_dataset_test.zip"
+    path = tmp_path / name
+    zs   = ZipStream(str(path))
+    zip_stream.register(name, zs)
+    try:
+        zs.write("a.txt", b"hello")
+        reader = zs.iter_bytes(chunk_size=4)
+        head   = next(reader)   # close 전에 이미 파일을 열고 있는 다운로드
+
+        old = time.time() - 10 * 3600
+        os.utime(path, (old, old))
+        assert [x["streaming"] for x in list_exports(str(tmp_path))] == [True]
+        assert collect_garbage(str(tmp_path), max_age_s=1, max_count=0) == []
+
+        zs.write("b.txt", b"world")
+        zs.close()
+        body = head + b"".join(reader)
+    finally:
+        zip_stream.unregister(name)
+
+    assert path.read_bytes() == body
+    with zipfile.ZipFile(io.BytesIO(body)) as zf:
+        assert zf.read("b.txt") == b"world"
+    assert [x["streaming"] for x in list_exports(str(tmp_path))] == [False]
+    os.utime(path, (old, old))
+    assert collect_garbage(str(tmp_path), max_age_s=1) == [name]
+
+
+def test_abort_removes_file(tmp_path):
+    path = tmp_path / "x.zip"
+    zs   = ZipStream(str(path))
+    zs.write("a.txt", b"x")
+    zs.abort()
+    assert not path.exists()
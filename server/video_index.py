@@ -0,0 +1,168 @@
+import os
+import threading
+import cv2
+import numpy as np
+
+from typing import Dict, Optional
+
+
+# =========================
+# 영상 인덱스 (업로드 직후 백그라운드로 생성, <video>.index.npz)
+#
+#   pts_ms    : float64[N]  프레임 i(0부터, 표시 순서)의 pts
+#   keyframes : int32[K]    keyframe 프레임 번호 (오름차순). 알 수 없으면 비어 있음
+#   fps / width / height
+#   CAP_PROP_FPS / CAP_PROP_FRAME_COUNT 는 컨테이너 메타데이터라 VFR·잘린 파일에서 틀릴 수 있음.
+#   OpenCV 의 seek 은 평균 fps 로 프레임 번호를 환산하므로, seek 후 실제 도착 위치를 pts 로 확인해 보정.
+# =========================
+INDEX_SUFFIX = ".index.npz"
+
+
+class VideoIndex:
+    def __init__(self, pts_ms: np.ndarray, keyframes: np.ndarray,
+                 fps: float, width: int, height: int):
+        self.pts_ms    = pts_ms
+        self.keyframes = keyframes
+        self.fps       = fps
+        self.width     = width
+        self.height    = height
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.pts_ms)
+
+    def frame_at_ms(self, t_ms: float) -> int:
+        """t_ms 이후 첫 프레임 번호 (0부터). 끝을 넘으면 frame_count."""
+        return int(np.searchsorted(self.pts_ms, t_ms - 1e-3, side="left"))
+
+    def nearest_frame(self, t_ms: float) -> int:
+        """pts 가 t_ms 에 가장 가까운 프레임 번호."""
+        i = int(np.searchsorted(self.pts_ms, t_ms))
+        if i > 0 and (i == len(self.pts_ms) or t_ms - self.pts_ms[i - 1] <= self.pts_ms[i] - t_ms):
+            return i - 1
+        return i
+
+    def keyframe_before(self, frame_idx: int) -> Optional[int]:
+        """frame_idx 이하의 가장 가까운 keyframe. keyframe 정보가 없으면 None."""
+        if len(self.keyframes) == 0:
+            return None
+        i = int(np.searchsorted(self.keyframes, frame_idx, side="right")) - 1
+        return int(self.keyframes[max(i, 0)])
+
+    def save(self, path: str):
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, pts_ms=self.pts_ms, keyframes=self.keyframes,
+                     meta=np.array([self.fps, self.width, self.height], dtype=np.float64))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "VideoIndex":
+        with np.load(path) as z:
+            fps, w, h = z["meta"].tolist()
+            return cls(z["pts_ms"], z["keyframes"], fps, int(w), int(h))
+
+
+def index_path(video_path: str) -> str:
+    return video_path + INDEX_SUFFIX
+
+
+def build_video_index(video_path: str) -> Optional[VideoIndex]:
+    """
+    패킷을 디코딩 없이 훑어서(raw 모드) 프레임별 pts 와 keyframe 위치를 수집.
+    raw 모드를 못 쓰는 빌드면 디코딩하며 pts 만 수집 (keyframe 정보 없음).
+    """
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        return None
+    fps_meta = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    width    = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)  or 0)
+    height   = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    raw      = bool(cap.set(cv2.CAP_PROP_FORMAT, -1))
+
+    pts, key_pts = [], []
+    try:
+        while cap.grab():
+            t = cap.get(cv2.CAP_PROP_POS_MSEC)
+            pts.append(t)
+            if raw and cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                key_pts.append(t)
+    finally:
+        cap.release()
+    if not pts:
+        return None
+
+    # 패킷은 디코딩 순서 → 표시 순서(pts 오름차순)로 정렬 후 keyframe 을 프레임 번호로 변환
+    pts_ms    = np.sort(np.asarray(pts, dtype=np.float64))
+    keyframes = np.unique(np.searchsorted(pts_ms, np.asarray(key_pts, dtype=np.float64))
+                          ).astype(np.int32)
+    span = pts_ms[-1] - pts_ms[0]
+    fps  = (len(pts_ms) - 1) * 1000.0 / span if len(pts_ms) > 1 and span > 0 else fps_meta
+    return VideoIndex(pts_ms, keyframes, float(fps), width, height)
+
+
+_build_locks: Dict[str, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+
+
+def ensure_video_index(video_path: str) -> Optional[VideoIndex]:
+    """저장된 인덱스를 읽고, 없으면 만들어서 저장. 같은 파일을 동시에 두 번 만들지 않음."""
+    path = index_path(video_path)
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(path, threading.Lock())
+    with lock:
+        if os.path.exists(path):
+            try:
+                return VideoIndex.load(path)
+            except (OSError, ValueError, KeyError):
+                pass
+        index = build_video_index(video_path)
+        if index is not None:
+            try:
+                index.save(path)
+            except OSError as e:
+                print("[VIDEO INDEX] 저장 실패:", e)
+        return index
+
+
+def _next_frame_after_seek(cap, index: VideoIndex) -> int:
+    # seek 은 목표 직전 프레임까지 디코딩해 두므로 POS_MSEC = 마지막으로 디코딩된 프레임의 pts
+    return index.nearest_frame(cap.get(cv2.CAP_PROP_POS_MSEC)) + 1
+
+
+def seek_to_frame(cap, index: Optional[VideoIndex], target: int, cur: Optional[int] = None):
+    """
+    다음 read()/retrieve() 가 target 프레임(0부터)이 되도록 이동.
+
+    OpenCV 의 seek 자체가 직전 keyframe 부터 디코딩해 전진하므로 seek 한 번의 비용은 인덱스로 줄지 않음.
+    인덱스로 하는 일:
+      - 현재 위치 cur 와 target 사이에 keyframe 이 없으면 seek 없이 grab() 으로 전진 (GOP 재디코딩 생략)
+      - pts 기준(POS_MSEC)으로 seek 하고, VFR 에서 평균 fps 환산 때문에 어긋난 만큼 grab() 으로 보정
+    """
+    if index is None or target <= 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, max(target, 0))
+        return
+    if target >= index.frame_count:
+        # 끝 이후: 마지막 프레임까지 가서 넘겨 두면 다음 read() 는 False (인덱스 범위 밖 pts 조회 방지)
+        seek_to_frame(cap, index, index.frame_count - 1, cur)
+        cap.grab()
+        return
+    kf = index.keyframe_before(target)
+    if cur is not None and kf is not None and kf <= cur <= target:
+        start = cur
+    else:
+        start = None
+        # 목표 pts → 안 되면(지나쳤으면) 직전 keyframe pts → 처음부터
+        for t in (target, kf):
+            if t is None or t <= 0:
+                continue
+            cap.set(cv2.CAP_PROP_POS_MSEC, float(index.pts_ms[t]))
+            start = _next_frame_after_seek(cap, index)
+            if start <= target:
+                break
+            start = None
+        if start is None:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            start = 0
+    for _ in range(target - start):
+        if not cap.grab():
+            return
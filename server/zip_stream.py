@@ -0,0 +1,126 @@
+import os
+import time
+import zipfile
+import threading
+
+from typing import Dict, Iterator, Optional
+
+
+# =========================
+# append-only ZIP (스트리밍 export)
+#
+#   entry 를 쓰는 즉시 파일 끝에 붙이고(data descriptor 방식, 앞부분을 다시 고치지 않음)
+#   다운로드 요청은 iter_bytes() 로 지금까지 쓰인 바이트부터 따라 읽어간다.
+#   처음부터 최종 이름 <path> 에 쓰고 close() 때 central directory 를 붙여 완성 (rename 없음:
+#   다운로드가 파일을 열고 있어도 Windows 에서 실패하지 않도록).
+#   쓰는 중인지는 _active 등록 여부로 구분 → /exports 는 streaming 으로 표시, janitor 는 건드리지 않음.
+# =========================
+PART_SUFFIX = ".part"   # _zip_dir 처럼 다 쓴 뒤 rename 하는 쪽에서 사용
+
+
+class _AppendOnly:
+    """zipfile 이 seek 하지 않도록 tell() 이 없는 파일 래퍼. 쓴 바이트 수를 센다."""
+    def __init__(self, f):
+        self._f     = f
+        self.nbytes = 0
+
+    def write(self, b):
+        n = self._f.write(b)
+        self.nbytes += n
+        return n
+
+    def flush(self):
+        self._f.flush()
+
+
+class ZipStream:
+    def __init__(self, path: str):
+        self.path     = path
+        self._file    = open(path, "wb")
+        self._out     = _AppendOnly(self._file)
+        self._zf      = zipfile.ZipFile(self._out, "w")
+        self._cond    = threading.Condition()
+        self.size     = 0       # reader 에게 공개된 바이트 수 (flush 완료분)
+        self.finished = False
+        self.failed   = False
+
+    def write(self, arcname: str, data: bytes, compress_type=zipfile.ZIP_STORED):
+        """entry 하나 추가. 여러 스레드에서 호출 가능."""
+        zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+        zinfo.compress_type = compress_type
+        with self._cond:
+            if self.finished:
+                raise ValueError("zip stream closed")
+            self._zf.writestr(zinfo, data)
+            self._publish()
+
+    def close(self):
+        with self._cond:
+            if self.finished:
+                return
+            self._zf.close()
+            self._publish()
+            self._file.close()
+            self.finished = True
+            self._cond.notify_all()
+
+    def abort(self):
+        """실패/취소. 따라 읽던 다운로드는 중단되고 파일은 삭제."""
+        with self._cond:
+            if self.finished:
+                return
+            self.failed = self.finished = True
+            self._cond.notify_all()
+            try: self._zf.close()
+            except Exception: pass
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _publish(self):
+        self._out.flush()
+        self.size = self._out.nbytes
+        self._cond.notify_all()
+
+    def iter_bytes(self, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """처음부터 읽기 시작해 쓰기가 끝날 때까지 따라 읽는 제너레이터 (StreamingResponse 용)."""
+        pos = 0
+        with open(self.path, "rb") as f:
+            while True:
+                with self._cond:
+                    while pos >= self.size and not self.finished:
+                        self._cond.wait(timeout=1.0)
+                    if self.failed:
+                        raise IOError("export aborted")
+                    avail, done = self.size - pos, self.finished
+                if avail <= 0 and done:
+                    return
+                while avail > 0:
+                    data = f.read(min(chunk_size, avail))
+                    if not data:
+                        break
+                    pos   += len(data)
+                    avail -= len(data)
+                    yield data
+
+
+# 진행 중인 스트리밍 export (zip_name → ZipStream). 끝나면 제거되고 이후에는 일반 파일로 서빙.
+_active: Dict[str, ZipStream] = {}
+_active_lock = threading.Lock()
+
+
+def register(name: str, zs: ZipStream):
+    with _active_lock:
+        _active[name] = zs
+
+
+def unregister(name: str):
+    with _active_lock:
+        _active.pop(name, None)
+
+
+def get_active(name: str) -> Optional[ZipStream]:
+    with _active_lock:
+        return _active.get(name)